@@ -1,11 +1,24 @@
 from django.contrib import admin
-from .models import Property, Query
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .models import Dataset, Property, Query, PrewarmedSummary, AnalysisJob, RequestProfile, ConversationSession
+from . import search
+
+
+@admin.register(Dataset)
+class DatasetAdmin(admin.ModelAdmin):
+    list_display = ('name', 'source', 'row_count', 'created_at', 'updated_at')
+    search_fields = ('name', 'source')
+    readonly_fields = ('row_count', 'created_at', 'updated_at')
 
 
 @admin.register(Property)
 class PropertyAdmin(admin.ModelAdmin):
-    list_display = ('location', 'property_type', 'price', 'year', 'demand_score')
-    list_filter = ('location', 'property_type', 'year')
+    list_display = ('location', 'property_type', 'price', 'year', 'demand_score', 'dataset')
+    list_filter = ('dataset', 'location', 'property_type', 'year')
+    list_select_related = ('dataset',)
     search_fields = ('location',)
 
 
@@ -15,3 +28,67 @@ class QueryAdmin(admin.ModelAdmin):
     list_filter = ('created_at', 'location_filter')
     search_fields = ('user_query', 'location_filter')
     readonly_fields = ('response_summary', 'chart_data', 'table_data')
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of LIKE scans over the whole history
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_matching(queryset, search_term), False
+
+
+@admin.register(PrewarmedSummary)
+class PrewarmedSummaryAdmin(admin.ModelAdmin):
+    list_display = ('location_filter', 'query_type', 'dataset', 'prompt_tokens', 'output_tokens', 'created_at')
+    list_filter = ('dataset', 'query_type')
+    list_select_related = ('dataset',)
+    search_fields = ('location_filter',)
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user_query', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user_query',)
+    readonly_fields = ('chart_data', 'table_data', 'summary', 'error')
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('path', 'method', 'status_code', 'duration_ms', 'sql_count', 'sql_time_ms', 'username', 'created_at')
+    list_filter = ('method', 'created_at')
+    search_fields = ('path', 'username')
+    exclude = ('stats',)
+    readonly_fields = (
+        'method', 'path', 'username', 'status_code', 'duration_ms', 'sql_count', 'sql_time_ms',
+        'download', 'summary', 'sql_queries', 'created_at',
+    )
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view), name='api_requestprofile_download'),
+        ] + super().get_urls()
+    
+    @admin.display(description='Profile')
+    def download(self, obj):
+        url = reverse('admin:api_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">Download .prof</a> (open with <code>python -m pstats</code> or snakeviz)', url)
+    
+    def download_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="request-{profile.pk}.prof"'
+        return response
+
+
+@admin.register(ConversationSession)
+class ConversationSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'turns', 'updated_at', 'expires_at')
+    list_filter = ('updated_at',)
+    readonly_fields = ('history', 'sent_contexts', 'created_at', 'updated_at')
+    
+    @admin.display(description='Turns')
+    def turns(self, obj):
+        return len(obj.history)
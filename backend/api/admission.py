@@ -0,0 +1,105 @@
+"""Admission control for LLM-bound requests.
+
+At most LLM_MAX_CONCURRENCY Gemini calls run at once per worker process and at
+most LLM_MAX_QUEUE requests wait for a slot. Anything beyond that is rejected
+immediately so the view can answer 429 instead of tying up a thread. Keep
+gunicorn's `threads` above concurrency + queue so cheap endpoints always get a thread.
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._queue_times = deque(maxlen=1000)
+        self._service_time = None  # EWMA of seconds spent holding a slot
+
+    def acquire(self):
+        """Take a slot, waiting in the bounded queue if needed; returns a token for release()"""
+        queued_at = time.monotonic()
+        with self._condition:
+            if self._active >= self.max_concurrent or self._waiting:
+                if self._waiting >= self.max_queue:
+                    self._rejected += 1
+                    raise AdmissionRejected('LLM queue is full', self._retry_after())
+                self._waiting += 1
+                deadline = queued_at + self.queue_timeout
+                try:
+                    while self._active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timed_out += 1
+                            raise AdmissionRejected('Timed out waiting for an LLM slot', self._retry_after())
+                        self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._active += 1
+            self._admitted += 1
+            self._queue_times.append(time.monotonic() - queued_at)
+        return time.monotonic()
+
+    def release(self, token):
+        """Give back a slot; may be called from a different thread than acquire()"""
+        elapsed = time.monotonic() - token
+        with self._condition:
+            self._active -= 1
+            self._service_time = elapsed if self._service_time is None else 0.8 * self._service_time + 0.2 * elapsed
+            self._condition.notify()
+
+    @contextmanager
+    def admit(self):
+        """Hold a slot for the duration of the block"""
+        token = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(token)
+
+    def _retry_after(self):
+        # Roughly how long until the current queue drains
+        service_time = self._service_time or settings.LLM_RETRY_AFTER_SECONDS
+        return max(1, math.ceil(service_time * (self._waiting + 1) / self.max_concurrent))
+
+    def snapshot(self):
+        with self._condition:
+            queue_times = sorted(self._queue_times)
+            return {
+                'maxConcurrent': self.max_concurrent,
+                'maxQueue': self.max_queue,
+                'active': self._active,
+                'waiting': self._waiting,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+                'timedOut': self._timed_out,
+                'queueTimeAvgMs': round(sum(queue_times) / len(queue_times) * 1000, 1) if queue_times else 0,
+                'queueTimeP95Ms': round(queue_times[min(len(queue_times) - 1, int(len(queue_times) * 0.95))] * 1000, 1) if queue_times else 0,
+                'queueTimeMaxMs': round(queue_times[-1] * 1000, 1) if queue_times else 0,
+                'serviceTimeMs': round(self._service_time * 1000, 1) if self._service_time is not None else None,
+            }
+
+
+llm_admission = AdmissionController(
+    settings.LLM_MAX_CONCURRENCY,
+    settings.LLM_MAX_QUEUE,
+    settings.LLM_QUEUE_TIMEOUT_SECONDS,
+)
@@ -1,6 +1,26 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Per-connection SQLite tuning so readers are never blocked by a writer"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        # Readers see the last committed snapshot while a reload transaction is open
+        cursor.execute('PRAGMA journal_mode=WAL')
+        # Safe with WAL (a power loss can drop the last commit, never corrupt the file)
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        # Wait for the write lock instead of failing with "database is locked"
+        cursor.execute(f'PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.execute(f'PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+    
+    def ready(self):
+        connection_created.connect(configure_sqlite, dispatch_uid='api.configure_sqlite')
@@ -0,0 +1,70 @@
+"""Per-process cache of the data context and pre-rendered prompt data sections.
+
+Two questions about the same location build an identical data context and
+identical data sections of the Gemini prompt; only the question line differs.
+Entries are keyed by (location filter, data version), so a reload produces new
+keys instead of serving stale data, and the least recently used entries are
+evicted once the estimated size passes DATA_CONTEXT_CACHE_MAX_MB.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by the total (estimated) size of its values"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'sizeMb': round(self._bytes / 1024 / 1024, 2),
+                'maxSizeMb': round(self.max_bytes / 1024 / 1024, 2),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hitRate': round(self._hits / lookups, 3) if lookups else None,
+                'evictions': self._evictions,
+            }
+
+
+data_context_cache = LRUCache(int(settings.DATA_CONTEXT_CACHE_MAX_MB * 1024 * 1024))
@@ -0,0 +1,192 @@
+"""Columnar, memory-mapped snapshot of the Property table.
+
+`export_dataset` writes the table as fixed-width numpy columns plus a
+dictionary-encoded location column. Gunicorn workers map the file read-only,
+so every worker on the host shares one copy of the pages in the OS page cache
+instead of each holding its own Python objects. Reloads write a new file and
+`os.replace` it over the old one; readers notice the new inode and remap.
+Each dataset has its own file (see `dataset_path`), so a query maps and
+scans only the dataset it asks about.
+
+Layout: 8-byte magic, uint32 header length, JSON header, then each column
+aligned to 8 bytes at the offset recorded in the header.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+
+MAGIC = b'REDSET01'
+ALIGNMENT = 8
+
+# (column, dtype); float columns use NaN for NULL
+NUMERIC_COLUMNS = [
+    ('id', '<i8'),
+    ('price', '<f8'),
+    ('price_per_sqft', '<f8'),
+    ('area_sqft', '<f8'),
+    ('year', '<i4'),
+    ('demand', '<i8'),
+    ('demand_score', '<f8'),
+]
+# Low-cardinality strings stored as int32 codes into a dictionary
+DICTIONARY_COLUMNS = ['location', 'property_type']
+NULLABLE_COLUMNS = {'price_per_sqft', 'area_sqft'}
+
+
+def dataset_path(dataset=None):
+    """File of `dataset` (None for DEFAULT_DATASET): SHARED_DATASET_PATH, or a sibling named after the dataset"""
+    path = str(settings.SHARED_DATASET_PATH)
+    if not dataset or dataset == settings.DEFAULT_DATASET:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{dataset}{extension}"
+
+
+def export_dataset(path=None, dataset=None):
+    """Write the properties of `dataset` to `path` atomically; returns the row count"""
+    from .services import DataProcessingService
+
+    path = str(path or dataset_path(dataset))
+    fields = [name for name, _ in NUMERIC_COLUMNS] + DICTIONARY_COLUMNS
+    # Keep the model's default ordering so rows come back in the same order as the ORM
+    queryset = DataProcessingService.filter_properties(dataset=dataset)
+    records = list(DataProcessingService.float_values_list(queryset, fields))
+
+    columns = {}
+    for index, (name, dtype) in enumerate(NUMERIC_COLUMNS):
+        values = [record[index] for record in records]
+        if name in NULLABLE_COLUMNS:
+            values = [np.nan if value is None else value for value in values]
+        columns[name] = np.asarray(values, dtype=np.dtype(dtype))
+
+    dictionaries = {}
+    for offset, name in enumerate(DICTIONARY_COLUMNS, start=len(NUMERIC_COLUMNS)):
+        values = [record[offset] for record in records]
+        dictionary = sorted(set(values))
+        lookup = {value: code for code, value in enumerate(dictionary)}
+        columns[name] = np.asarray([lookup[value] for value in values], dtype='<i4')
+        dictionaries[name] = dictionary
+
+    header = {
+        'rows': len(records),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'dictionaries': dictionaries,
+        'columns': {},
+    }
+    # Offsets depend on the header size, so lay out columns relative to the data start
+    position = 0
+    for name, array in columns.items():
+        position = _align(position)
+        header['columns'][name] = {'dtype': array.dtype.str, 'offset': position}
+        position += array.nbytes
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(len(MAGIC) + 4 + len(header_bytes))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(MAGIC)
+        fh.write(struct.pack('<I', len(header_bytes)))
+        fh.write(header_bytes)
+        for name, array in columns.items():
+            fh.seek(data_start + header['columns'][name]['offset'])
+            fh.write(array.tobytes())
+        fh.truncate(data_start + position)
+        fh.flush()
+        os.fsync(fh.fileno())
+    # Readers holding the old mapping keep the old inode alive until they remap
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+def _align(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class SharedDataset:
+    """Read-only view over an exported dataset file"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as fh:
+            stat = os.fstat(fh.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{self.path} is not a dataset file')
+        (header_length,) = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._mmap[header_start:header_start + header_length])
+        data_start = _align(header_start + header_length)
+
+        self.rows = header['rows']
+        self.created_at = header['created_at']
+        self.dictionaries = header['dictionaries']
+        # np.frombuffer gives zero-copy views straight onto the shared pages
+        self.columns = {
+            name: np.frombuffer(self._mmap, dtype=np.dtype(spec['dtype']), count=self.rows,
+                                offset=data_start + spec['offset'])
+            for name, spec in header['columns'].items()
+        }
+
+    def location_mask(self, location):
+        """Boolean row mask matching filter_properties' case-insensitive `icontains`"""
+        needle = location.lower()
+        codes = [code for code, name in enumerate(self.dictionaries['location']) if needle in name.lower()]
+        return np.isin(self.columns['location'], codes)
+
+    def fetch_rows(self, location=None, locations=None):
+        """Return rows as dicts shaped like Property.objects.values()"""
+        if locations:
+            names = set(locations)
+            codes = [code for code, name in enumerate(self.dictionaries['location']) if name in names]
+            indexes = np.flatnonzero(np.isin(self.columns['location'], codes))
+        elif location:
+            indexes = np.flatnonzero(self.location_mask(location))
+        else:
+            indexes = np.arange(self.rows)
+
+        # Convert whole columns at once; only the selected rows become Python objects
+        selected = {name: self.columns[name][indexes].tolist() for name, _ in NUMERIC_COLUMNS}
+        for name in DICTIONARY_COLUMNS:
+            dictionary = self.dictionaries[name]
+            selected[name] = [dictionary[code] for code in self.columns[name][indexes].tolist()]
+        for name in NULLABLE_COLUMNS:
+            selected[name] = [None if value != value else value for value in selected[name]]
+
+        names = list(selected)
+        return [dict(zip(names, values)) for values in zip(*(selected[name] for name in names))]
+
+
+_datasets = {}  # path -> SharedDataset
+_dataset_lock = threading.Lock()
+
+
+def get_shared_dataset(dataset=None):
+    """Return this process's mapping of the file of `dataset`, remapping after a reload.
+
+    Returns None when the file has not been exported yet.
+    """
+    path = dataset_path(dataset)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    shared = _datasets.get(path)
+    if shared is None or shared.identity != (stat.st_ino, stat.st_mtime_ns):
+        with _dataset_lock:
+            shared = _datasets.get(path)
+            if shared is None or shared.identity != (stat.st_ino, stat.st_mtime_ns):
+                shared = _datasets[path] = SharedDataset(path)
+    return shared
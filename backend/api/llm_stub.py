@@ -0,0 +1,50 @@
+"""Stand-in for Gemini, enabled with LLM_BACKEND=stub.
+
+Replies after a log-normal latency (median LLM_STUB_LATENCY_MS, spread
+LLM_STUB_LATENCY_SIGMA) and fails LLM_STUB_ERROR_RATE of calls, so load tests
+exercise the real admission, deadline and fallback paths on one machine
+without an API key or quota.
+"""
+import math
+import random
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+
+
+class StubLLMError(Exception):
+    pass
+
+
+_random = random.Random(settings.LLM_STUB_SEED)
+
+
+def sample_latency():
+    """Seconds the next stub call will take"""
+    median = settings.LLM_STUB_LATENCY_MS / 1000
+    if median <= 0:
+        return 0.0
+    if settings.LLM_STUB_LATENCY_SIGMA <= 0:
+        return median
+    return _random.lognormvariate(math.log(median), settings.LLM_STUB_LATENCY_SIGMA)
+
+
+def generate_content(prompt):
+    """Mimic GenerativeModel.generate_content(): a response with .text and .usage_metadata"""
+    time.sleep(sample_latency())
+    if _random.random() < settings.LLM_STUB_ERROR_RATE:
+        raise StubLLMError('Simulated LLM failure')
+
+    text = (
+        "**Stub summary**\n\n"
+        f"Generated without calling Gemini for a {len(prompt):,} character prompt."
+    )
+    return SimpleNamespace(
+        text=text,
+        # Roughly four characters per token, like Gemini's English tokenization
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(text) // 4,
+        ),
+    )
@@ -0,0 +1,99 @@
+import gzip
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Property
+from api.renderers import ColumnarJSONRenderer, MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from api.services import DataProcessingService, PROPERTY_ROW_FIELDS, DECIMAL_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Compare row fetch time and the payload size and encode time of the analyze tableData in each wire format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Synthetic rows when the database has fewer')
+        parser.add_argument('--repeat', type=int, default=5, help='Encodes per format (best time is reported)')
+
+    def handle(self, *args, **options):
+        self._bench_fetch(options['repeat'])
+
+        table_data = DataProcessingService.prepare_table_data(DataProcessingService.fetch_rows())
+        if len(table_data) < options['rows']:
+            table_data = self._synthetic_rows(options['rows'])
+        payload = {'summary': 'x' * 2000, 'tableData': table_data, 'count': len(table_data)}
+
+        renderers = [('json (stdlib)', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('json (orjson)', ORJSONRenderer()))
+        else:
+            self.stdout.write('orjson not installed, ORJSONRenderer falls back to the stdlib encoder')
+        renderers.append(('columnar json', ColumnarJSONRenderer()))
+        if msgpack is not None:
+            renderers.append(('msgpack columnar', MessagePackRenderer()))
+        else:
+            self.stdout.write('msgpack not installed, skipping MessagePack')
+
+        self.stdout.write(f"{len(table_data)} rows")
+        self.stdout.write(f"{'format':<18} {'bytes':>12} {'gzip bytes':>12} {'encode ms':>10}")
+        baseline = None
+        for name, renderer in renderers:
+            best = float('inf')
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                body = renderer.render(payload, renderer.media_type, {})
+                best = min(best, time.perf_counter() - started)
+            baseline = baseline or len(body)
+            self.stdout.write(
+                f"{name:<18} {len(body):>12,} {len(gzip.compress(body)):>12,} {best * 1000:>10.1f}"
+                f"  ({len(body) / baseline:.0%} of json)"
+            )
+
+    def _bench_fetch(self, repeat):
+        """Decimal rows converted in Python vs the same rows cast to float in SQL"""
+        queryset = Property.objects.all()
+        count = queryset.count()
+        if not count:
+            self.stdout.write('No properties loaded, skipping the fetch benchmark')
+            return
+
+        def decimal_rows():
+            rows = list(queryset.values(*PROPERTY_ROW_FIELDS))
+            for row in rows:
+                for field in DECIMAL_FIELDS:
+                    if row[field] is not None:
+                        row[field] = float(row[field])
+            return rows
+
+        self.stdout.write(f"{count} rows fetched from the database")
+        self.stdout.write(f"{'fetch':<18} {'ms':>10}")
+        for name, fetch in (
+            ('decimal + float()', decimal_rows),
+            ('sql float cast', lambda: DataProcessingService.float_rows(queryset)),
+        ):
+            best = float('inf')
+            for _ in range(repeat):
+                started = time.perf_counter()
+                fetch()
+                best = min(best, time.perf_counter() - started)
+            self.stdout.write(f"{name:<18} {best * 1000:>10.1f}")
+        self.stdout.write('')
+
+    @staticmethod
+    def _synthetic_rows(count):
+        random.seed(0)
+        rows = []
+        for _ in range(count):
+            rows.append({
+                'location': random.choice(['Wakad', 'Akurdi', 'Aundh', 'Baner', 'Hinjewadi']),
+                'type': 'residential',
+                'price': round(random.uniform(4000, 12000), 2),
+                'pricePerSqft': round(random.uniform(50, 500), 2),
+                'area': round(random.uniform(1000, 90000), 2),
+                'year': random.randint(2015, 2024),
+                'demand': random.randint(0, 500),
+                'demandScore': random.uniform(0, 4000),
+            })
+        return rows
@@ -0,0 +1,111 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+
+from api.services import DataProcessingService
+from api.sql_recorder import record_queries
+
+# (name, method, path, body, max queries). {location} and {other} are replaced with loaded locations.
+BUDGETS = [
+    ('analyze', 'post', '/api/queries/analyze/', {'query': 'Should I invest in {location}?'}, 4),
+    ('analyze (local)', 'post', '/api/queries/analyze/', {'query': 'List properties in {location}'}, 2),
+    ('analyze (comparison)', 'post', '/api/queries/analyze/', {'query': 'Compare {location} vs {other}'}, 4),
+    ('analyze (session)', 'post', '/api/queries/analyze/', {'query': 'Should I invest in {location}?', 'sessionId': None}, 6),
+    ('download_data', 'post', '/api/queries/download_data/', {'query': '{location}'}, 1),
+    ('history', 'get', '/api/queries/history/', None, 1),
+    ('properties', 'get', '/api/properties/', None, 2),
+    ('by_location', 'get', '/api/properties/by_location/?location={location}', None, 1),
+    ('locations_list', 'get', '/api/properties/locations_list/', None, 1),
+    ('top', 'get', '/api/properties/top/?metric=roi&k=5', None, 1),
+    ('timeseries', 'get', '/api/properties/timeseries/?locations={location}', None, 1),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Call each API endpoint with every SQL statement recorded and fail if one runs more '
+        'queries than its budget, repeats an identical query, runs the same statement '
+        'N+1-style, or spends longer than --max-sql-ms in the database. Writes are rolled back '
+        'and Gemini is replaced by the zero-latency stub.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location', help='Location used in the requests (default: the first loaded one)')
+        parser.add_argument('--repeat', type=int, default=2,
+                            help='Calls per endpoint; the worst is checked, so cold caches count too')
+        parser.add_argument('--max-sql-ms', type=float, default=settings.QUERY_BUDGET_MAX_SQL_MS,
+                            help='Database time allowed per request')
+        parser.add_argument('--repeated-threshold', type=int, default=3,
+                            help='Runs of one statement within a request that count as N+1')
+        parser.add_argument('--verbose-sql', action='store_true', help='Print every statement that was run')
+
+    def handle(self, *args, **options):
+        locations = DataProcessingService.location_index(refresh=True)
+        if not locations:
+            raise CommandError('No properties loaded; run load_data.py first')
+        location = options['location'] or locations[0]
+        other = next((name for name in locations if name != location), location)
+        names = {'location': location, 'other': other}
+
+        # Connection setup (SQLite pragmas) is not part of any request's budget
+        for connection in connections.all():
+            connection.ensure_connection()
+
+        client = Client(SERVER_NAME='localhost')
+        failures = []
+        self.stdout.write(f"{'endpoint':<20} {'status':>6} {'queries':>8} {'budget':>7} {'sql ms':>8}  problems")
+        # Budgets describe the default path: approximate statistics skip the local fast path
+        with override_settings(LLM_BACKEND='stub', LLM_STUB_LATENCY_MS=0, LLM_STUB_ERROR_RATE=0,
+                               APPROX_STATS_MIN_ROWS=0), transaction.atomic():
+            for name, method, path, body, budget in BUDGETS:
+                worst = None
+                for _ in range(options['repeat']):
+                    status, recorder = self._call(client, method, path.format(**names), body, names)
+                    if worst is None or (recorder.count, recorder.total) > (worst[1].count, worst[1].total):
+                        worst = status, recorder
+                status, recorder = worst
+                problems = self._problems(recorder, status, budget, options)
+                failures.extend(f'{name}: {problem}' for problem in problems)
+                self.stdout.write(
+                    f"{name:<20} {status:>6} {recorder.count:>8} {budget:>7} {recorder.total_ms:>8.1f}  "
+                    + ('; '.join(problems) or 'ok')
+                )
+                if options['verbose_sql'] or problems:
+                    for query in recorder.queries:
+                        self.stdout.write(f"    {query['ms']:>8.2f} ms  {query['sql'][:200]}")
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'{len(failures)} query budget violation(s)')
+        self.stdout.write(self.style.SUCCESS('Every endpoint is within its query budget'))
+
+    @staticmethod
+    def _call(client, method, path, body, names):
+        with record_queries() as recorder:
+            if method == 'post':
+                body = {key: value.format(**names) if isinstance(value, str) else value
+                        for key, value in body.items()}
+                response = client.post(path, json.dumps(body), content_type='application/json')
+            else:
+                response = client.get(path)
+            response.content  # streaming and lazy bodies run their queries here
+        return response.status_code, recorder
+
+    @staticmethod
+    def _problems(recorder, status, budget, options):
+        problems = []
+        if not 200 <= status < 300:
+            problems.append(f'HTTP {status}')
+        if recorder.count > budget:
+            problems.append(f'{recorder.count} queries, budget {budget}')
+        if recorder.total_ms > options['max_sql_ms']:
+            problems.append(f"{recorder.total_ms:.0f} ms in SQL, budget {options['max_sql_ms']:g} ms")
+        for sql, times in recorder.duplicates():
+            problems.append(f'identical query run {times} times: {sql[:80]}')
+        for sql, times in recorder.repeated_statements(options['repeated_threshold']):
+            problems.append(f'statement run {times} times (N+1?): {sql[:80]}')
+        return problems
@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.models import Property
+from api.services import DataProcessingService
+
+COPIED_FIELDS = [
+    'location', 'property_type', 'price', 'price_per_sqft', 'area_sqft', 'year', 'demand', 'demand_score'
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Reload the default dataset (with its own rows) several times while reader threads query it '
+        'continuously; fails if any reader saw an empty or partial dataset or a database error. '
+        'Its pre-warmed summaries are cleared, as after any reload.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Concurrent reader threads')
+        parser.add_argument('--reloads', type=int, default=3, help='Number of reloads to run')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask for confirmation')
+
+    def handle(self, *args, **options):
+        expected_total = DataProcessingService.filter_properties().count()
+        if not expected_total:
+            raise CommandError('No properties loaded; run load_data.py first')
+        expected = {
+            location: DataProcessingService.filter_properties(location=location).count()
+            for location in DataProcessingService.location_index(refresh=True)[:20]
+        }
+        if options['interactive']:
+            answer = input(
+                f'This rewrites all {expected_total} properties {options["reloads"]} times and clears '
+                'pre-warmed summaries. Continue? [y/N] '
+            )
+            if answer.lower() not in ('y', 'yes'):
+                raise CommandError('Aborted')
+
+        stop = threading.Event()
+        results = {'reads': 0, 'anomalies': [], 'errors': [], 'latencies': []}
+        lock = threading.Lock()
+        readers = [
+            threading.Thread(target=self._reader, args=(index, expected_total, expected, stop, results, lock))
+            for index in range(options['readers'])
+        ]
+        for reader in readers:
+            reader.start()
+
+        reload_times = []
+        try:
+            time.sleep(0.5)  # let every reader get going on the old data first
+            for _ in range(options['reloads']):
+                properties = [
+                    Property(**dict(zip(COPIED_FIELDS, row)))
+                    for row in DataProcessingService.filter_properties().order_by('id').values_list(*COPIED_FIELDS)
+                ]
+                started = time.perf_counter()
+                DataProcessingService.replace_properties(properties)
+                reload_times.append(time.perf_counter() - started)
+                time.sleep(0.2)
+        finally:
+            stop.set()
+            for reader in readers:
+                reader.join()
+
+        latencies = sorted(results['latencies'])
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+        self.stdout.write(
+            f"{options['reloads']} reloads of {expected_total} rows "
+            f"(avg {sum(reload_times) / len(reload_times) * 1000:.0f} ms, vendor {connection.vendor}), "
+            f"{options['readers']} readers"
+        )
+        self.stdout.write(
+            f"{results['reads']} reads, max read {latencies[-1] * 1000 if latencies else 0:.0f} ms, "
+            f"p99 {p99 * 1000:.0f} ms"
+        )
+        for problem in (results['anomalies'] + results['errors'])[:10]:
+            self.stdout.write(f"  {problem}")
+        if results['anomalies'] or results['errors']:
+            raise CommandError(
+                f"{len(results['anomalies'])} inconsistent reads and {len(results['errors'])} errors during reload"
+            )
+        self.stdout.write(self.style.SUCCESS('Every read saw a complete dataset'))
+
+    @staticmethod
+    def _reader(index, expected_total, expected, stop, results, lock):
+        rng = random.Random(index)
+        locations = list(expected)
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    total = DataProcessingService.filter_properties().count()
+                    location = rng.choice(locations)
+                    rows = DataProcessingService.fetch_rows(location=location)
+                except Exception as e:
+                    with lock:
+                        results['errors'].append(f'{type(e).__name__}: {e}')
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    results['reads'] += 1
+                    results['latencies'].append(elapsed)
+                    if total != expected_total:
+                        results['anomalies'].append(f'dataset had {total} rows, expected {expected_total}')
+                    if len(rows) != expected[location]:
+                        results['anomalies'].append(f'{location}: {len(rows)} rows, expected {expected[location]}')
+        finally:
+            connection.close()
@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.dataset_file import dataset_path, export_dataset
+
+
+class Command(BaseCommand):
+    help = "Export a dataset's properties to its memory-mapped columnar dataset file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', default=settings.DEFAULT_DATASET, help='Dataset to export')
+        parser.add_argument('--path', help='Output file (default: the file workers read the dataset from)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        path = options['path'] or dataset_path(options['dataset'])
+        rows = export_dataset(path, dataset=options['dataset'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {rows} properties of {options['dataset']} to {path} in {time.monotonic() - started:.2f}s"
+        ))
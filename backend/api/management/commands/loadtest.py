@@ -0,0 +1,224 @@
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+ENDPOINTS = ('analyze', 'properties', 'download_data')
+
+QUERY_TEMPLATES = [
+    'Analyze {location}',
+    'Show price growth for {location}',
+    'Compare demand trends in {location}',
+    'Should I invest in {location}?',
+    'List properties in {location}',
+    'Average price in {location}',
+]
+FALLBACK_LOCATIONS = ['Wakad', 'Akurdi', 'Aundh', 'Baner']
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def parse_mix(value):
+    """'analyze=1,properties=3' -> {'analyze': 1.0, 'properties': 3.0}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise CommandError(f"Unknown endpoint '{name}' in --mix (choose from {', '.join(ENDPOINTS)})")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Invalid weight in --mix: '{part}'")
+    if not any(weight > 0 for weight in mix.values()):
+        raise CommandError('--mix needs at least one positive weight')
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive analyze, properties and download_data against a running server at a fixed '
+        'concurrency and request mix; reports throughput, latency percentiles and errors. '
+        'Start the server with LLM_BACKEND=stub to replace Gemini with a simulated model.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the server under test')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client threads')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to measure for')
+        parser.add_argument('--warmup', type=float, default=3, help='Seconds of load before measuring starts')
+        parser.add_argument(
+            '--mix', default='analyze=1,properties=3,download_data=1',
+            help='Relative weight of each endpoint, e.g. analyze=1,properties=3,download_data=1',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=None,
+            help='Open-loop target requests/second across all threads. Latency is measured from each '
+                 'request\'s scheduled start, so queueing delay is not hidden. Default: closed loop',
+        )
+        parser.add_argument('--query', action='append', dest='queries', help='Analyze query to use (repeatable)')
+        parser.add_argument('--timeout', type=float, default=120, help='Per-request timeout in seconds')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the request sequence')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        mix = parse_mix(options['mix'])
+        queries = options['queries'] or self._build_queries(base_url, options['timeout'])
+
+        self.state = {
+            'lock': threading.Lock(),
+            'samples': defaultdict(list),  # endpoint -> [(latency, ok)]
+            'statuses': Counter(),
+            'sources': Counter(),
+            'next_slot': 0,
+        }
+        started = time.perf_counter()
+        measure_from = started + options['warmup']
+        stop_at = measure_from + options['duration']
+
+        threads = [
+            threading.Thread(
+                target=self._client,
+                args=(index, base_url, mix, queries, options, started, measure_from, stop_at),
+                daemon=True,
+            )
+            for index in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        report = self._report(options, mix)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print_report(report)
+
+    def _build_queries(self, base_url, timeout):
+        try:
+            locations = requests.get(f'{base_url}/api/properties/locations_list/', timeout=timeout).json()['locations']
+        except (requests.RequestException, ValueError, KeyError) as e:
+            raise CommandError(f'Cannot reach {base_url}: {e}')
+        locations = locations[:20] or FALLBACK_LOCATIONS
+        return [template.format(location=location) for location in locations for template in QUERY_TEMPLATES]
+
+    def _client(self, index, base_url, mix, queries, options, started, measure_from, stop_at):
+        rng = random.Random(options['seed'] * 1000 + index)
+        endpoints, weights = zip(*mix.items())
+        session = requests.Session()
+        rate = options['rate']
+
+        while True:
+            if rate:
+                with self.state['lock']:
+                    slot = self.state['next_slot']
+                    self.state['next_slot'] += 1
+                scheduled = started + slot / rate
+                if scheduled >= stop_at:
+                    return
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= stop_at:
+                    return
+
+            endpoint = rng.choices(endpoints, weights)[0]
+            status_code, source = self._send(session, base_url, endpoint, rng.choice(queries), options['timeout'])
+            finished = time.perf_counter()
+            if scheduled < measure_from:
+                continue
+            with self.state['lock']:
+                self.state['samples'][endpoint].append((finished - scheduled, 200 <= status_code < 300))
+                self.state['statuses'][status_code] += 1
+                if source:
+                    self.state['sources'][source] += 1
+
+    @staticmethod
+    def _send(session, base_url, endpoint, query, timeout):
+        """Issue one request; returns (status code or 0 for a connection error, analyze summarySource)"""
+        try:
+            if endpoint == 'analyze':
+                response = session.post(f'{base_url}/api/queries/analyze/', json={'query': query}, timeout=timeout)
+                source = response.json().get('summarySource') if response.status_code == 200 else None
+                return response.status_code, source
+            if endpoint == 'properties':
+                response = session.get(f'{base_url}/api/properties/', timeout=timeout)
+            else:
+                response = session.post(f'{base_url}/api/queries/download_data/', json={'query': query}, timeout=timeout)
+            response.content  # read the whole body, like a real client
+            return response.status_code, None
+        except (requests.RequestException, ValueError):
+            return 0, None
+
+    def _report(self, options, mix):
+        endpoints = {}
+        all_samples = []
+        for endpoint in mix:
+            samples = self.state['samples'].get(endpoint, [])
+            all_samples.extend(samples)
+            endpoints[endpoint] = self._summarize(samples, options['duration'])
+        return {
+            'url': options['url'],
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'rate': options['rate'],
+            'mix': mix,
+            'endpoints': endpoints,
+            'total': self._summarize(all_samples, options['duration']),
+            'statusCodes': {str(code): count for code, count in sorted(self.state['statuses'].items())},
+            'summarySources': dict(self.state['sources']),
+        }
+
+    @staticmethod
+    def _summarize(samples, duration):
+        latencies = sorted(latency for latency, _ in samples)
+        errors = sum(1 for _, ok in samples if not ok)
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            'requests': len(samples),
+            'throughput': round(len(samples) / duration, 2),
+            'p50Ms': ms(percentile(latencies, 0.50)),
+            'p95Ms': ms(percentile(latencies, 0.95)),
+            'p99Ms': ms(percentile(latencies, 0.99)),
+            'maxMs': ms(latencies[-1] if latencies else None),
+            'errorRate': round(errors / len(samples), 4) if samples else 0,
+        }
+
+    def _print_report(self, report):
+        mode = f"open loop at {report['rate']} req/s" if report['rate'] else 'closed loop'
+        self.stdout.write(
+            f"{report['url']}: {report['concurrency']} threads, {report['duration']:g}s measured, {mode}"
+        )
+        self.stdout.write(f"{'endpoint':<14} {'requests':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+                          f"{'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+        rows = list(report['endpoints'].items()) + [('total', report['total'])]
+        for name, stats in rows:
+            self.stdout.write(
+                f"{name:<14} {stats['requests']:>8} {stats['throughput']:>8.1f} "
+                + ' '.join(f"{stats[key] if stats[key] is not None else '-':>9}" for key in ('p50Ms', 'p95Ms', 'p99Ms', 'maxMs'))
+                + f" {stats['errorRate']:>7.1%}"
+            )
+        self.stdout.write('status codes: ' + ', '.join(
+            f"{'conn error' if code == '0' else code}: {count}" for code, count in report['statusCodes'].items()
+        ))
+        if report['summarySources']:
+            self.stdout.write('analyze summary sources: ' + ', '.join(
+                f"{source}: {count}" for source, count in sorted(report['summarySources'].items())
+            ))
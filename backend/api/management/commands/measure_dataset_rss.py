@@ -0,0 +1,98 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def read_memory():
+    """Return (rss_kb, pss_kb) for this process; PSS is None off Linux"""
+    try:
+        with open('/proc/self/smaps_rollup') as fh:
+            fields = dict(line.split(':', 1) for line in fh if ':' in line)
+        return int(fields['Rss'].split()[0]), int(fields['Pss'].split()[0])
+    except (OSError, KeyError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-worker memory of per-request ORM loading against the shared '
+        'memory-mapped dataset file, with several worker processes alive at once'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Simulated gunicorn workers per mode')
+        parser.add_argument('--location', default=None, help='Location filter used for the per-request fetch')
+        parser.add_argument('--dataset', default=settings.DEFAULT_DATASET, help='Dataset to load')
+        parser.add_argument('--child', choices=['orm', 'mmap'], help='(internal) run as one measured worker')
+
+    def handle(self, *args, **options):
+        if options['child']:
+            return self._run_child(options['child'], options['location'], options['dataset'])
+
+        from api.services import DataProcessingService
+
+        if DataProcessingService.dataset_id(options['dataset']) is None:
+            raise CommandError(f"Dataset {options['dataset']} not found; load it with load_data.py first")
+        results = {}
+        for mode in ('orm', 'mmap'):
+            results[mode] = self._run_workers(mode, options['workers'], options['location'], options['dataset'])
+
+        self.stdout.write(f"{'mode':<6} {'workers':>7} {'RSS/worker':>12} {'PSS/worker':>12} {'load delta':>12}")
+        for mode, samples in results.items():
+            rss = sum(s['rss_kb'] for s in samples) / len(samples)
+            pss = [s['pss_kb'] for s in samples if s['pss_kb'] is not None]
+            delta = sum(s['delta_kb'] for s in samples) / len(samples)
+            self.stdout.write(
+                f"{mode:<6} {len(samples):>7} {rss / 1024:>10.1f}MB "
+                f"{(sum(pss) / len(pss) / 1024) if pss else float('nan'):>10.1f}MB {delta / 1024:>10.1f}MB"
+            )
+
+    def _run_workers(self, mode, workers, location, dataset):
+        if mode == 'mmap':
+            from api.dataset_file import export_dataset
+            export_dataset(dataset=dataset)
+
+        command = [sys.executable, sys.argv[0], 'measure_dataset_rss', '--child', mode, '--dataset', dataset]
+        if location:
+            command += ['--location', location]
+        children = [
+            subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+            for _ in range(workers)
+        ]
+        # Measure only once every worker has loaded, so shared pages are counted as shared
+        for child in children:
+            if child.stdout.readline().strip() != 'ready':
+                raise CommandError(f'{mode} worker failed to start')
+        samples = []
+        for child in children:
+            output, _ = child.communicate('measure\n')
+            samples.append(json.loads(output))
+        return samples
+
+    def _run_child(self, mode, location, dataset):
+        from api.services import DataProcessingService
+
+        rss_before, _ = read_memory()
+        if mode == 'orm':
+            # Today's behaviour: every worker materializes model rows per request, of the
+            # current version of one dataset like fetch_rows()
+            held = list(DataProcessingService.filter_properties(dataset=dataset).values())
+            if location:
+                held += list(DataProcessingService.filter_properties(location=location, dataset=dataset).values())
+        else:
+            from api.dataset_file import SharedDataset, dataset_path
+            shared = SharedDataset(dataset_path(dataset))
+            # Fault every column page in so it counts towards RSS
+            held = [float(column.sum()) for column in shared.columns.values()]
+            held.append(shared.fetch_rows(location=location) if location else None)
+
+        sys.stdout.write('ready\n')
+        sys.stdout.flush()
+        sys.stdin.readline()
+        rss, pss = read_memory()
+        sys.stdout.write(json.dumps({'rss_kb': rss, 'pss_kb': pss, 'delta_kb': rss - rss_before}))
+        sys.stdout.flush()
@@ -0,0 +1,122 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import PrewarmedSummary
+from api.services import GeminiService, DataProcessingService, QueryClassifier
+
+
+class Command(BaseCommand):
+    help = 'Pre-generate canonical summaries for every location and query intent of a dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.PREWARM_CONCURRENCY,
+            help='Maximum number of Gemini calls in flight at once',
+        )
+        parser.add_argument(
+            '--location', action='append', dest='locations',
+            help='Only pre-warm this location (repeatable)',
+        )
+        parser.add_argument('--dataset', default=settings.DEFAULT_DATASET, help='Dataset to pre-warm')
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        dataset_id = DataProcessingService.dataset_id(dataset)
+        if dataset_id is None:
+            raise CommandError(f'Dataset {dataset} not found; load it with load_data.py first')
+        index = DataProcessingService.location_index(refresh=True, dataset=dataset)
+        # Resolve each location like analyze does: a name selects every location containing it,
+        # and the summary is keyed by the same display name analyze looks it up with
+        targets = [] if options['locations'] else [[]]  # [] is 'all', stored when no location is given
+        for location in options['locations'] or index:
+            names = [name for name in index if location.lower() in name.lower()]
+            if not names:
+                self.stderr.write(f"No properties found for {location}, skipping")
+            elif names not in targets:
+                targets.append(names)
+
+        # Load every location's rows up front so worker threads never touch the DB
+        jobs = []
+        skipped = 0
+        for names in targets:
+            location = ', '.join(names) or None
+            properties_list = DataProcessingService.fetch_rows(location=location, locations=names, dataset=dataset)
+            if not properties_list:
+                continue
+            # From APPROX_STATS_MIN_ROWS rows on analyze answers from approximate statistics, never locally
+            approximate = (
+                settings.APPROX_STATS_MIN_ROWS and not settings.USE_SHARED_DATASET
+                and len(properties_list) >= settings.APPROX_STATS_MIN_ROWS
+            )
+            for query_type in QueryClassifier.INTENTS:
+                # A canonical question the local fast path answers never reaches the stored summary
+                if settings.LOCAL_FAST_PATH and not approximate and QueryClassifier.local_intent(
+                    self._canonical_query(location, query_type), query_type
+                ):
+                    skipped += 1
+                    continue
+                jobs.append((location, query_type, properties_list))
+        if skipped:
+            self.stdout.write(f"Skipping {skipped} summaries the local fast path answers (LOCAL_FAST_PATH)")
+
+        total = len(jobs)
+        self.stdout.write(f"Pre-warming {total} summaries with concurrency {options['concurrency']}...")
+
+        started = time.monotonic()
+        done = failed = 0
+        prompt_tokens = output_tokens = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as pool:
+            futures = {
+                pool.submit(self._generate, location, query_type, properties_list): (location, query_type)
+                for location, query_type, properties_list in jobs
+            }
+            for future in as_completed(futures):
+                location, query_type = futures[future]
+                location_filter = location or 'all'
+                done += 1
+                try:
+                    summary, usage, elapsed = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"[{done}/{total}] {location_filter} / {query_type}: failed ({e})")
+                    continue
+
+                PrewarmedSummary.objects.update_or_create(
+                    dataset_id=dataset_id,
+                    location_filter=location_filter,
+                    query_type=query_type,
+                    defaults={
+                        'summary': summary,
+                        'prompt_tokens': usage['prompt_tokens'],
+                        'output_tokens': usage['output_tokens'],
+                    },
+                )
+                prompt_tokens += usage['prompt_tokens']
+                output_tokens += usage['output_tokens']
+                self.stdout.write(
+                    f"[{done}/{total}] {location_filter} / {query_type}: ok "
+                    f"({usage['prompt_tokens']} in, {usage['output_tokens']} out, {elapsed:.1f}s)"
+                )
+
+        cost = GeminiService.estimate_cost({'prompt_tokens': prompt_tokens, 'output_tokens': output_tokens})
+        self.stdout.write(self.style.SUCCESS(
+            f"Pre-warmed {total - failed}/{total} summaries in {time.monotonic() - started:.1f}s | "
+            f"tokens: {prompt_tokens} in, {output_tokens} out | est. cost ${cost:.4f}"
+        ))
+
+    @staticmethod
+    def _canonical_query(location, query_type):
+        return QueryClassifier.CANONICAL_QUERIES[query_type].format(location=location or 'all locations')
+
+    @staticmethod
+    def _generate(location, query_type, properties_list):
+        started = time.monotonic()
+        query = Command._canonical_query(location, query_type)
+        summary, usage = GeminiService().summarize(
+            properties_list, location=location, query=query, query_type=query_type
+        )
+        return summary, usage, time.monotonic() - started
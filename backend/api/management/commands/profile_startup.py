@@ -0,0 +1,80 @@
+import json
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported or cached
+BOOT_SCRIPT = """
+import json, os, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+from config.wsgi import application
+import config.urls
+boot = time.perf_counter() - started
+
+warmup = 0.0
+if {warm!r}:
+    from api.warmup import warm_up
+    started = time.perf_counter()
+    warm_up()
+    warmup = time.perf_counter() - started
+
+from django.conf import settings
+from django.test import Client
+client = Client(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+requests = []
+for path in {paths!r}:
+    started = time.perf_counter()
+    client.get(path)
+    requests.append([path, time.perf_counter() - started])
+print(json.dumps({{'boot': boot, 'warmup': warmup, 'requests': requests}}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Profile worker cold boot (python -X importtime) and first-request latency with and without warm-up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest top-level imports to show')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Request path timed after boot (repeatable, default /api/properties/ twice)',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/properties/', '/api/properties/']
+
+        cold, import_times = self._boot(paths, warm=False)
+        warm, _ = self._boot(paths, warm=True)
+
+        self.stdout.write(f"Slowest top-level imports during boot (cumulative):")
+        for name, micros in import_times[:options['top']]:
+            self.stdout.write(f"  {micros / 1000:8.1f} ms  {name}")
+
+        self.stdout.write("")
+        for label, result in (('cold', cold), ('warmed', warm)):
+            self.stdout.write(
+                f"{label:<7} boot {result['boot'] * 1000:7.1f} ms | warm-up {result['warmup'] * 1000:7.1f} ms"
+            )
+            for index, (path, seconds) in enumerate(result['requests'], 1):
+                self.stdout.write(f"        request {index} {path} {seconds * 1000:7.1f} ms")
+
+    def _boot(self, paths, warm):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT.format(warm=warm, paths=paths)],
+            capture_output=True, text=True,
+        )
+        if process.returncode != 0:
+            raise CommandError(process.stderr[-2000:])
+
+        import_times = []
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            # Nested imports are indented; keep only modules imported directly
+            if name.startswith(' ') and not name.startswith('  '):
+                import_times.append((name.strip(), int(cumulative)))
+        import_times.sort(key=lambda item: item[1], reverse=True)
+        return json.loads(process.stdout.strip().splitlines()[-1]), import_times
@@ -0,0 +1,124 @@
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import AnalysisJob
+from api.services import AnalysisService
+
+
+class Command(BaseCommand):
+    help = 'Run the background worker pool that processes queued analyze jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.ANALYSIS_JOB_WORKERS,
+            help='Number of jobs processed concurrently',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(f"Analysis worker {self.worker_id} started with {workers} workers")
+
+        in_flight = set()
+        last_recovery = None
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                in_flight = {f for f in in_flight if not f.done()}
+
+                # Jobs survive restarts: anything orphaned by a dead worker goes back in the queue
+                if last_recovery is None or time.monotonic() - last_recovery > settings.ANALYSIS_JOB_STALE_SECONDS / 2:
+                    self._recover_orphaned_jobs()
+                    last_recovery = time.monotonic()
+
+                claimed = 0
+                for job in self._claim_jobs(workers - len(in_flight)):
+                    in_flight.add(pool.submit(self._process, job))
+                    claimed += 1
+
+                if not claimed:
+                    if options['once'] and not in_flight:
+                        break
+                    time.sleep(settings.ANALYSIS_JOB_POLL_SECONDS)
+
+    def _claim_jobs(self, limit):
+        if limit <= 0:
+            return []
+        candidates = AnalysisJob.objects.filter(
+            status=AnalysisJob.STATUS_QUEUED
+        ).order_by('created_at').values_list('pk', flat=True)[:limit]
+
+        claimed = []
+        for pk in list(candidates):
+            # The conditional UPDATE makes the claim atomic across worker processes
+            updated = AnalysisJob.objects.filter(pk=pk, status=AnalysisJob.STATUS_QUEUED).update(
+                status=AnalysisJob.STATUS_RUNNING,
+                claimed_by=self.worker_id,
+                started_at=timezone.now(),
+                attempts=F('attempts') + 1,
+            )
+            if updated:
+                claimed.append(AnalysisJob.objects.get(pk=pk))
+        return claimed
+
+    def _recover_orphaned_jobs(self):
+        hostname = socket.gethostname()
+        stale_before = timezone.now() - timedelta(seconds=settings.ANALYSIS_JOB_STALE_SECONDS)
+
+        for job in AnalysisJob.objects.filter(status=AnalysisJob.STATUS_RUNNING).exclude(claimed_by=self.worker_id):
+            host, _, pid = job.claimed_by.rpartition(':')
+            dead = host == hostname and pid.isdigit() and not self._pid_alive(int(pid))
+            stale = job.started_at is None or job.started_at < stale_before
+            if not (dead or stale):
+                continue
+
+            if job.attempts >= settings.ANALYSIS_JOB_MAX_ATTEMPTS:
+                updates = {
+                    'status': AnalysisJob.STATUS_FAILED,
+                    'error': f'Gave up after {job.attempts} attempts',
+                    'finished_at': timezone.now(),
+                }
+            else:
+                updates = {'status': AnalysisJob.STATUS_QUEUED, 'claimed_by': ''}
+            AnalysisJob.objects.filter(pk=job.pk, status=AnalysisJob.STATUS_RUNNING,
+                                       claimed_by=job.claimed_by).update(**updates)
+            self.stdout.write(f"Recovered orphaned job {job.pk} -> {updates['status']}")
+
+    @staticmethod
+    def _pid_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _process(self, job):
+        started = time.monotonic()
+        try:
+            close_old_connections()
+            AnalysisService.run_job(job)
+            self.stdout.write(f"Job {job.pk} {job.status} in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            AnalysisJob.objects.filter(pk=job.pk).update(
+                status=AnalysisJob.STATUS_FAILED,
+                error=str(e),
+                finished_at=timezone.now(),
+            )
+            self.stderr.write(f"Job {job.pk} failed: {e}")
+        finally:
+            # Each pool thread has its own DB connection
+            connection.close()
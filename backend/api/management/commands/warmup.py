@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = 'Pre-build the LLM client, location index and data caches, reporting how long each took'
+
+    def handle(self, *args, **options):
+        timings = warm_up()
+        for name, seconds, error in timings:
+            line = f"{name:<20} {seconds * 1000:8.1f} ms"
+            self.stdout.write(self.style.ERROR(f"{line}  failed: {error}") if error else line)
+        total = sum(seconds for _, seconds, _ in timings) * 1000
+        if any(error for _, _, error in timings):
+            self.stdout.write(self.style.WARNING(f"Warm-up finished with errors in {total:.1f} ms"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Warm-up finished in {total:.1f} ms"))
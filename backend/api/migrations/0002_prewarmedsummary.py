@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrewarmedSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_filter', models.CharField(max_length=255)),
+                ('query_type', models.CharField(max_length=50)),
+                ('summary', models.TextField()),
+                ('prompt_tokens', models.IntegerField(default=0)),
+                ('output_tokens', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['location_filter', 'query_type'],
+                'constraints': [models.UniqueConstraint(fields=('location_filter', 'query_type'), name='unique_prewarmed_summary')],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+from django.db import migrations
+
+# SQLite: an external-content FTS5 table over api_query, kept in sync by triggers.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE api_query_fts USING fts5(
+        user_query, response_summary,
+        content='api_query', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER api_query_fts_insert AFTER INSERT ON api_query BEGIN
+        INSERT INTO api_query_fts(rowid, user_query, response_summary)
+        VALUES (new.id, new.user_query, new.response_summary);
+    END
+    """,
+    """
+    CREATE TRIGGER api_query_fts_delete AFTER DELETE ON api_query BEGIN
+        INSERT INTO api_query_fts(api_query_fts, rowid, user_query, response_summary)
+        VALUES ('delete', old.id, old.user_query, old.response_summary);
+    END
+    """,
+    """
+    CREATE TRIGGER api_query_fts_update AFTER UPDATE OF user_query, response_summary ON api_query BEGIN
+        INSERT INTO api_query_fts(api_query_fts, rowid, user_query, response_summary)
+        VALUES ('delete', old.id, old.user_query, old.response_summary);
+        INSERT INTO api_query_fts(rowid, user_query, response_summary)
+        VALUES (new.id, new.user_query, new.response_summary);
+    END
+    """,
+    # Index the history that already exists
+    "INSERT INTO api_query_fts(api_query_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS api_query_fts_insert',
+    'DROP TRIGGER IF EXISTS api_query_fts_delete',
+    'DROP TRIGGER IF EXISTS api_query_fts_update',
+    'DROP TABLE IF EXISTS api_query_fts',
+]
+
+# PostgreSQL: a generated tsvector column (maintained by the database) with a GIN index.
+# The question is weighted above the answer.
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE api_query ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(user_query, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(response_summary, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX api_query_search_vector_gin ON api_query USING GIN (search_vector)',
+]
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS api_query_search_vector_gin',
+    'ALTER TABLE api_query DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_analysisjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
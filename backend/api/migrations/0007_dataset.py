@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_conversationsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Dataset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.SlugField(max_length=100, unique=True)),
+                ('source', models.CharField(blank=True, max_length=500)),
+                ('row_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='prewarmedsummary',
+            name='unique_prewarmed_summary',
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='api_propert_locatio_7e8cd2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='api_propert_propert_80e661_idx',
+        ),
+        migrations.AddField(
+            model_name='analysisjob',
+            name='dataset',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='prewarmedsummary',
+            name='dataset',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='prewarmed_summaries', to='api.dataset'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='dataset',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='properties', to='api.dataset'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:39
+
+from django.conf import settings
+from django.db import migrations
+
+
+def assign_default_dataset(apps, schema_editor):
+    """Rows loaded before datasets existed become the default dataset"""
+    Dataset = apps.get_model('api', 'Dataset')
+    Property = apps.get_model('api', 'Property')
+    PrewarmedSummary = apps.get_model('api', 'PrewarmedSummary')
+    count = Property.objects.count()
+    if not count and not PrewarmedSummary.objects.exists():
+        return
+    dataset, _ = Dataset.objects.get_or_create(name=settings.DEFAULT_DATASET, defaults={'row_count': count})
+    Property.objects.filter(dataset__isnull=True).update(dataset=dataset)
+    PrewarmedSummary.objects.filter(dataset__isnull=True).update(dataset=dataset)
+
+
+class Migration(migrations.Migration):
+    # Kept apart from the schema changes around it: on PostgreSQL, altering a
+    # table in the same transaction as this UPDATE fails with "pending trigger events"
+
+    dependencies = [
+        ('api', '0007_dataset'),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_default_dataset, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_assign_default_dataset'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='prewarmedsummary',
+            name='dataset',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prewarmed_summaries', to='api.dataset'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='dataset',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='properties', to='api.dataset'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['dataset', 'location', 'year'], name='api_propert_dataset_0962a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['dataset', 'property_type'], name='api_propert_dataset_f679de_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='prewarmedsummary',
+            constraint=models.UniqueConstraint(fields=('dataset', 'location_filter', 'query_type'), name='unique_prewarmed_summary'),
+        ),
+    ]
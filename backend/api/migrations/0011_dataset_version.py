@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_analysisjob_row_count'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='property',
+            name='api_propert_dataset_0962a4_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='property',
+            name='api_propert_dataset_f679de_idx',
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='staged_version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dataset',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['dataset', 'version', 'location', 'year'], name='api_propert_dataset_70f902_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['dataset', 'version', 'property_type'], name='api_propert_dataset_b7056f_idx'),
+        ),
+    ]
@@ -1,5 +1,27 @@
+import uuid
 from django.db import models
 
+
+class Dataset(models.Model):
+    """One loaded upload; its properties, pre-warmed summaries and caches are kept apart from other datasets"""
+    name = models.SlugField(max_length=100, unique=True)
+    source = models.CharField(max_length=500, blank=True)
+    row_count = models.IntegerField(default=0)
+    # Properties of this version are the live ones; a reload stages the next version next to them
+    version = models.IntegerField(default=0)
+    # Last version handed out to a reload, so concurrent reloads never stage into the same one
+    staged_version = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last time load_data.py replaced its rows
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.row_count} properties)"
+
+
 class Property(models.Model):
     PROPERTY_TYPES = [
         ('residential', 'Residential'),
@@ -7,6 +29,10 @@ class Property(models.Model):
         ('industrial', 'Industrial'),
     ]
     
+    # Indexed through the composite indexes below, which every query filters by first
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='properties', db_index=False)
+    # Only rows whose version is the dataset's current one are served (see DataProcessingService.replace_properties)
+    version = models.IntegerField(default=0)
     location = models.CharField(max_length=255)
     property_type = models.CharField(max_length=50, choices=PROPERTY_TYPES)
     price = models.DecimalField(max_digits=15, decimal_places=2)
@@ -21,8 +47,8 @@ class Property(models.Model):
     class Meta:
         ordering = ['-year', 'location']
         indexes = [
-            models.Index(fields=['location', 'year']),
-            models.Index(fields=['property_type']),
+            models.Index(fields=['dataset', 'version', 'location', 'year']),
+            models.Index(fields=['dataset', 'version', 'property_type']),
         ]
     
     def __str__(self):
@@ -42,3 +68,106 @@ class Query(models.Model):
     
     def __str__(self):
         return f"Query: {self.user_query[:50]}..."
+
+
+class PrewarmedSummary(models.Model):
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='prewarmed_summaries')
+    location_filter = models.CharField(max_length=255)
+    query_type = models.CharField(max_length=50)
+    summary = models.TextField()
+    prompt_tokens = models.IntegerField(default=0)
+    output_tokens = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['location_filter', 'query_type']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dataset', 'location_filter', 'query_type'], name='unique_prewarmed_summary'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.location_filter} / {self.query_type}"
+
+
+class AnalysisJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUSES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_query = models.TextField()
+    # Dataset name from the request; blank means DEFAULT_DATASET
+    dataset = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default=STATUS_QUEUED)
+    query_type = models.CharField(max_length=50, blank=True)
+    location_filter = models.CharField(max_length=255, null=True, blank=True)
+    chart_data = models.JSONField(null=True, blank=True)
+    table_data = models.JSONField(null=True, blank=True)
+    # All matched rows; table_data holds only a sample of them for approximate statistics
+    row_count = models.IntegerField(null=True, blank=True)
+    summary = models.TextField(null=True, blank=True)
+    summary_source = models.CharField(max_length=20, blank=True)
+    error = models.TextField(blank=True)
+    claimed_by = models.CharField(max_length=255, blank=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Job {self.id} ({self.status}): {self.user_query[:50]}"
+
+
+class RequestProfile(models.Model):
+    """A profiled request captured by api.profiling.ProfilingMiddleware"""
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    username = models.CharField(max_length=150, blank=True)
+    status_code = models.IntegerField(null=True)
+    duration_ms = models.FloatField()
+    sql_count = models.IntegerField(default=0)
+    sql_time_ms = models.FloatField(default=0)
+    sql_queries = models.JSONField(default=list)
+    summary = models.TextField(blank=True)
+    # marshal-ed pstats data, the format written by cProfile's dump_stats()
+    stats = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class ConversationSession(models.Model):
+    """Server-side chat state, so follow-up questions don't resend the full dataset"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # [{'query', 'answer', 'location', 'queryType'}, ...], oldest first, capped at SESSION_MAX_TURNS
+    history = models.JSONField(default=list)
+    # Data already sent in full this session: [[location key, data version], ...]
+    sent_contexts = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        ordering = ['-updated_at']
+    
+    def __str__(self):
+        return f"Session {self.id} ({len(self.history)} turns)"
@@ -0,0 +1,86 @@
+"""Opt-in per-request profiling for staff users.
+
+Send `X-Profile: 1` or add `?profile=1` while logged in as staff (Django
+session, e.g. after signing in to /admin/). The request runs under cProfile
+with every SQL query timed, and the result is saved as a RequestProfile
+(download the .prof file from the admin and open it with `python -m pstats`
+or snakeviz). The response carries `X-Profile-Id`.
+
+Requests without the header/parameter only pay for one dict lookup and a
+substring check. Only the request thread is profiled: a Gemini call running
+on the LLM executor shows up as time spent waiting on its future.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+
+from django.conf import settings
+
+from .sql_recorder import record_queries
+
+# cProfile can only have one active profiler per process on newer Pythons
+_profile_lock = threading.Lock()
+
+
+def _wants_profile(request):
+    if request.META.get('HTTP_X_PROFILE') == '1':
+        return True
+    return 'profile=' in request.META.get('QUERY_STRING', '') and request.GET.get('profile') == '1'
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (settings.REQUEST_PROFILING and _wants_profile(request)):
+            return self.get_response(request)
+        user = getattr(request, 'user', None)
+        if not (user and user.is_staff):
+            return self.get_response(request)
+        if not _profile_lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response['X-Profile'] = 'busy'
+            return response
+        try:
+            return self._profile(request, user)
+        finally:
+            _profile_lock.release()
+
+    def _profile(self, request, user):
+        from .models import RequestProfile
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with record_queries(settings.PROFILE_MAX_SQL_QUERIES) as recorder:
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - started
+
+        stats = pstats.Stats(profiler)
+        summary = io.StringIO()
+        # Likely N+1 patterns first, they are easy to miss in the SQL list
+        for sql, times in recorder.repeated_statements():
+            summary.write(f"SQL run {times} times: {sql[:300]}\n")
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(settings.PROFILE_SUMMARY_LINES)
+
+        profile = RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            username=user.get_username(),
+            status_code=getattr(response, 'status_code', None),
+            duration_ms=round(duration * 1000, 2),
+            sql_count=recorder.count,
+            sql_time_ms=round(recorder.total * 1000, 2),
+            sql_queries=recorder.queries,
+            summary=summary.getvalue(),
+            stats=marshal.dumps(stats.stats),
+        )
+        response['X-Profile-Id'] = str(profile.id)
+        return response
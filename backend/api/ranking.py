@@ -0,0 +1,87 @@
+"""Top-k property rankings shared by the /properties/top endpoint and the Gemini prompt.
+
+Each metric has a Python scorer for rows in memory and an ORM expression for
+ranking in the database; both select with a bounded heap in O(n log k).
+"""
+import heapq
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast
+
+
+def roi_score(prop):
+    """Demand per unit of price, normalized; None when the price is unknown"""
+    price = float(prop.get('price') or 0)
+    if price <= 0:
+        return None
+    return (float(prop.get('demand_score') or 0) / price) * 100000
+
+
+def demand_score(prop):
+    return float(prop.get('demand_score') or 0)
+
+
+def value_score(prop):
+    """High demand weighted against price (the prompt's 'investment_score')"""
+    return (float(prop.get('demand_score') or 0) * 0.6) - (float(prop.get('price') or 0) / 100000 * 0.4)
+
+
+METRICS = {
+    'roi': roi_score,
+    'demand': demand_score,
+    'value': value_score,
+}
+
+
+def _expressions():
+    price = Cast('price', FloatField())
+    demand = Cast('demand_score', FloatField())
+    return {
+        'roi': demand / price * Value(100000.0),
+        'demand': F('demand_score'),
+        'value': demand * Value(0.6) - price / Value(100000.0) * Value(0.4),
+    }
+
+
+def top_k(rows, metric, k):
+    """Return [(score, row), ...] for the k best rows, best first.
+
+    Ties keep their input order, matching sorted(..., reverse=True)[:k].
+    Rows the metric cannot score (e.g. ROI without a price) are skipped.
+    """
+    score = METRICS[metric]
+    scored = ((score(row), row) for row in rows)
+    return heapq.nlargest(k, ((s, row) for s, row in scored if s is not None), key=lambda item: item[0])
+
+
+class TopK:
+    """Streaming top_k(): rows are added one at a time and only the k best are kept"""
+
+    def __init__(self, metric, k):
+        self.score = METRICS[metric]
+        self.k = k
+        self._heap = []  # (score, -arrival, row); the worst kept row is on top
+        self._arrivals = 0
+
+    def add(self, row):
+        score = self.score(row)
+        if score is None:
+            return
+        self._arrivals += 1
+        # On a tie the earlier row ranks higher, as in top_k()
+        item = (score, -self._arrivals, row)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def result(self):
+        """[(score, row), ...] best first, like top_k()"""
+        return [(score, row) for score, _, row in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+
+def top_k_queryset(queryset, metric, k):
+    """Rank a Property queryset in the database, annotating each row with `score`"""
+    if metric == 'roi':
+        queryset = queryset.filter(price__gt=0)
+    return queryset.annotate(score=_expressions()[metric]).order_by('-score', 'id')[:k]
@@ -0,0 +1,113 @@
+"""Response renderers.
+
+ORJSONRenderer is the default JSON renderer. The compact formats below are picked
+by the client through the Accept header (or ?format=):
+
+- application/json: the default row-oriented layout.
+- application/vnd.realestate.columnar+json (?format=columnar): every list of flat
+  records (tableData, property listings...) becomes one array per column, so key
+  names are sent once instead of once per row.
+- application/msgpack (?format=msgpack): the columnar layout in MessagePack.
+  Only offered when the optional `msgpack` package is installed.
+"""
+import datetime
+import decimal
+import uuid
+
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+SCALAR_TYPES = (str, int, float, bool, type(None), decimal.Decimal, datetime.date, datetime.datetime, uuid.UUID)
+
+
+def _is_record_list(value):
+    return (
+        isinstance(value, list) and value
+        and all(isinstance(item, dict) for item in value)
+        and all(isinstance(field, SCALAR_TYPES) for item in value for field in item.values())
+    )
+
+
+def to_columnar(data):
+    """Recursively turn lists of flat dicts into {column: [values...]}"""
+    if _is_record_list(data):
+        columns = {}
+        for row in data:
+            for key in row:
+                columns.setdefault(key, None)
+        return {key: [row.get(key) for row in data] for key in columns}
+    if isinstance(data, dict):
+        return {key: to_columnar(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [to_columnar(item) for item in data]
+    return data
+
+
+def _orjson_default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if hasattr(obj, 'tolist'):  # numpy scalars and arrays
+        return obj.tolist()
+    raise TypeError(f'Cannot serialize {type(obj).__name__}')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson, falling back to the stdlib encoder without it"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        options = orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_orjson_default, option=options)
+
+
+class ColumnarJSONRenderer(ORJSONRenderer):
+    media_type = 'application/vnd.realestate.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError(f'Cannot serialize {type(obj).__name__}')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(to_columnar(data), default=_msgpack_default, use_bin_type=True)
+
+
+# Renderers for endpoints that return large record lists
+COMPACT_RENDERER_CLASSES = [ORJSONRenderer, BrowsableAPIRenderer, ColumnarJSONRenderer]
+if msgpack is not None:
+    COMPACT_RENDERER_CLASSES.append(MessagePackRenderer)
@@ -0,0 +1,140 @@
+"""Full-text search over past queries (user_query and response_summary).
+
+Backed by the index created in migration 0004: an FTS5 table on SQLite and a
+GIN-indexed tsvector column on PostgreSQL. Both are maintained by the database
+on every insert/update/delete, so there is nothing to refresh from Python.
+Other backends fall back to a LIKE scan.
+
+Ranking has to score every match, which is what makes very common words slow
+on a large history. Both backends therefore rank only the newest
+QUERY_SEARCH_CANDIDATES matches (found by walking the index backwards by id),
+so the cost is bounded no matter how many rows contain the word.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Query
+
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+
+# Ranked on the index alone; the snippet is only built for the `limit` rows of the
+# inner query (looked up again by rowid), not for every candidate the sort sees
+SQLITE_SEARCH = f"""
+    SELECT top.rowid,
+           snippet(api_query_fts, 1, '{SNIPPET_START}', '{SNIPPET_END}', '...', 24) AS snippet,
+           top.rank
+    FROM (
+        SELECT rowid, bm25(api_query_fts, 2.0, 1.0) AS rank
+        FROM api_query_fts
+        WHERE api_query_fts MATCH %s AND rowid >= (
+            SELECT coalesce(min(rowid), 0) FROM (
+                SELECT rowid FROM api_query_fts WHERE api_query_fts MATCH %s ORDER BY rowid DESC LIMIT %s
+            )
+        )
+        ORDER BY rank
+        LIMIT %s
+    ) top
+    JOIN api_query_fts ON api_query_fts.rowid = top.rowid
+    WHERE api_query_fts MATCH %s
+    ORDER BY top.rank
+"""
+
+POSTGRES_SEARCH = f"""
+    SELECT id,
+           ts_headline('english', response_summary, query,
+                       'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=35, MinWords=15') AS snippet,
+           rank
+    FROM (
+        SELECT q.id, q.response_summary, query,
+               ts_rank_cd(q.search_vector, query) AS rank
+        FROM api_query q, websearch_to_tsquery('english', %s) query
+        WHERE q.search_vector @@ query AND q.id >= (
+            SELECT coalesce(min(id), 0) FROM (
+                SELECT id FROM api_query WHERE search_vector @@ query ORDER BY id DESC LIMIT %s
+            ) recent
+        )
+        ORDER BY rank DESC
+        LIMIT %s
+    ) top
+    ORDER BY rank DESC
+"""
+
+
+def _fts5_query(text):
+    """Turn free text into an FTS5 expression where every word must match.
+
+    Words are quoted so FTS5 operators in user input are taken literally.
+    No prefix (*) matching: the porter tokenizer already folds plurals, and
+    prefix scans over common words are far slower than exact lookups.
+    """
+    terms = re.findall(r'\w+', text.lower())
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def search_queries(text, limit=10):
+    """Return up to `limit` past queries matching `text`, best match first.
+
+    Each result has the question, a highlighted snippet of the answer and a
+    relevance score (higher is better).
+    """
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        match = _fts5_query(text)
+        if match is None:
+            return []
+        sql, params = SQLITE_SEARCH, [match, match, settings.QUERY_SEARCH_CANDIDATES, limit, match]
+    elif vendor == 'postgresql':
+        sql, params = POSTGRES_SEARCH, [text, settings.QUERY_SEARCH_CANDIDATES, limit]
+    else:
+        return _search_like(text, limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    # Only `limit` rows, loaded through the ORM so field types match the other endpoints
+    queries = Query.objects.only('id', 'user_query', 'location_filter', 'created_at').in_bulk([row[0] for row in rows])
+    return [
+        # bm25() is lower-is-better, ts_rank_cd() higher-is-better
+        _result(queries[query_id], snippet, round(-rank if vendor == 'sqlite' else rank, 4))
+        for query_id, snippet, rank in rows
+        if query_id in queries
+    ]
+
+
+def filter_matching(queryset, text):
+    """Restrict a Query queryset to rows matching `text` through the index (used by the admin)"""
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        match = _fts5_query(text)
+        if match is None:
+            return queryset
+        return queryset.filter(id__in=RawSQL('SELECT rowid FROM api_query_fts WHERE api_query_fts MATCH %s', [match]))
+    if vendor == 'postgresql':
+        return queryset.filter(id__in=RawSQL(
+            "SELECT id FROM api_query WHERE search_vector @@ websearch_to_tsquery('english', %s)", [text]
+        ))
+    return queryset.filter(Q(user_query__icontains=text) | Q(response_summary__icontains=text))
+
+
+def _result(query, snippet, score):
+    return {
+        'id': query.id,
+        'userQuery': query.user_query,
+        'locationFilter': query.location_filter,
+        'createdAt': query.created_at,
+        'snippet': snippet,
+        'score': score,
+    }
+
+
+def _search_like(text, limit):
+    queryset = filter_matching(Query.objects.all(), text)
+    return [_result(query, query.response_summary[:200], None) for query in queryset[:limit]]
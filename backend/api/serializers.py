@@ -1,8 +1,32 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Property, Query
+from .services import DataProcessingService
+
+
+class DatasetField(serializers.SlugField):
+    """Name of a loaded dataset"""
+    
+    def __init__(self, **kwargs):
+        super().__init__(max_length=100, **kwargs)
+    
+    def run_validators(self, value):
+        super().run_validators(value)
+        if DataProcessingService.dataset_id(value) is None:
+            raise serializers.ValidationError(f'Unknown dataset: {value}')
+
+
+class DatasetQuerySerializer(serializers.Serializer):
+    # ?dataset= of the property endpoints (DEFAULT_DATASET when omitted)
+    dataset = DatasetField(required=False)
 
 
 class PropertySerializer(serializers.ModelSerializer):
+    # Plain floats: list endpoints feed this serializer dict rows that were cast to float in SQL
+    price = serializers.FloatField(read_only=True)
+    price_per_sqft = serializers.FloatField(read_only=True, allow_null=True)
+    area_sqft = serializers.FloatField(read_only=True, allow_null=True)
+    
     class Meta:
         model = Property
         fields = [
@@ -19,3 +43,21 @@ class QuerySerializer(serializers.ModelSerializer):
 
 class QueryRequestSerializer(serializers.Serializer):
     query = serializers.CharField(max_length=500)
+    # Dataset to query (DEFAULT_DATASET when omitted)
+    dataset = DatasetField(required=False)
+    # analyze only: null starts a conversation session, an id continues one
+    sessionId = serializers.UUIDField(required=False, allow_null=True)
+
+
+class BatchQueryRequestSerializer(serializers.Serializer):
+    queries = serializers.ListField(
+        child=serializers.CharField(max_length=500),
+        min_length=1,
+        max_length=settings.ANALYZE_BATCH_MAX_QUERIES
+    )
+    dataset = DatasetField(required=False)
+    parallelism = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.ANALYZE_BATCH_MAX_PARALLELISM,
+        required=False
+    )
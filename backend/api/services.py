@@ -1,12 +1,25 @@
-import google.generativeai as genai
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+import difflib
 import json
-from django.db.models import Avg, Count, Sum, Q
-from .models import Property
+import re
+import sys
+import threading
+import time
+from django.db.models import Avg, Count, F, Max, Sum, Q, FloatField, Subquery
+from django.db.models.functions import Cast
+from .models import Dataset, Property, Query, PrewarmedSummary, AnalysisJob, ConversationSession
+from . import ranking
+from django.utils import timezone
+from .admission import AdmissionRejected
+from .context_cache import data_context_cache
+from .sketches import KLLSketch, Reservoir, RunningStats
 from collections import defaultdict
 import statistics
 from decimal import Decimal
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -19,56 +32,49 @@ class DecimalEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+_gemini_model = None
+_gemini_model_lock = threading.Lock()
+
+
+def get_gemini_model():
+    """Return the process-wide Gemini client, importing the SDK on first use.
+    
+    google.generativeai takes most of a second to import, so it is kept off the
+    module import path; `manage.py warmup` calls this before traffic arrives.
+    """
+    global _gemini_model
+    if _gemini_model is None:
+        with _gemini_model_lock:
+            if _gemini_model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                _gemini_model = genai.GenerativeModel('gemini-2.5-flash')
+    return _gemini_model
+
+
 class GeminiService:
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+    # Deterministic analyzers used instead of Gemini, keyed by QueryClassifier intent
+    LOCAL_ANALYZERS = {
+        'listing': '_generate_listing',
+        'comparison': '_generate_comparison_analysis',
+        'trend': '_generate_trend_analysis',
+        'recommendation': '_generate_recommendations',
+        'general': '_generate_general_analysis',
+        'stats': '_generate_stats_summary',
+    }
     
-    def generate_intelligent_summary(self, properties_data, location=None, query=None, query_type=None):
+    @property
+    def model(self):
+        # Built on first use so the local summarizer never loads the SDK
+        return get_gemini_model()
+    
+    def generate_intelligent_summary(self, properties_data, location=None, query=None, query_type=None, context=None):
         """Generate TRULY intelligent conversational summaries using Gemini AI"""
         try:
             if not properties_data:
                 return "No data available for the given query."
             
-            # Convert properties_data to JSON-serializable format
-            properties_data = self._ensure_json_serializable(properties_data)
-            
-            # Prepare rich data context for Gemini
-            data_context = self._prepare_data_context(properties_data, location, query_type)
-            
-            # Build a smart prompt that uses Gemini's full conversational power
-            prompt = self._build_intelligent_prompt(query, properties_data, data_context, query_type, location)
-            
-            # Call Gemini with streaming for real-time response
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.8,  # Creative but factual
-                    top_p=0.95,
-                    top_k=50,
-                    max_output_tokens=3000
-                ),
-                safety_settings=[
-                    {
-                        "category": genai.types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                        "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
-                    },
-                    {
-                        "category": genai.types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                        "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
-                    },
-                    {
-                        "category": genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                        "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
-                    },
-                    {
-                        "category": genai.types.HarmCategory.HARM_CATEGORY_HARASSMENT,
-                        "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
-                    }
-                ]
-            )
-            
-            summary = response.text if response and response.text else "Unable to generate analysis."
+            summary, _ = self.summarize(properties_data, location, query, query_type, context=context)
             # Don't fall back to generic response - if there's an issue, it will be clear
             return summary
         
@@ -79,8 +85,288 @@ class GeminiService:
             # Return more informative error
             return f"Error generating analysis: {str(e)}"
     
+    def summarize(self, properties_data, location=None, query=None, query_type=None, context=None, conversation=None):
+        """Generate a summary and return it with its token usage.
+        
+        Unlike generate_intelligent_summary, errors are raised to the caller so
+        batch jobs can tell a failed generation from a real answer. Pass a
+        `context` from build_context/cached_context to reuse it across several questions.
+        `conversation` ({'history': [...], 'include_details': bool}) turns this into a
+        follow-up prompt that carries the earlier turns instead of the full listings.
+        """
+        if context is None:
+            context = self.build_context(properties_data, location, query_type)
+        _, data_sections = context
+        
+        # Build a smart prompt that uses Gemini's full conversational power
+        if conversation and conversation['history']:
+            prompt = self._build_followup_prompt(
+                query, conversation['history'], data_sections, conversation['include_details']
+            )
+        else:
+            prompt = self._build_intelligent_prompt(query, data_sections)
+        
+        response = self._generate_content(prompt)
+        
+        summary = response.text if response and response.text else "Unable to generate analysis."
+        return summary, self._extract_usage(response)
+    
+    def build_context(self, properties_data, location=None, query_type=None):
+        """Return (data context, rendered prompt data sections) for a set of properties"""
+        # Convert properties_data to JSON-serializable format
+        properties_data = self._ensure_json_serializable(properties_data)
+        
+        # Prepare rich data context for Gemini
+        data_context = self._prepare_data_context(properties_data, location, query_type)
+        return data_context, self._build_data_sections(properties_data, data_context)
+    
+    def build_approximate_context(self, rows, locations=None):
+        """build_context() for result sets too large to hold, in one pass over `rows` (an iterator).
+        
+        Counts, sums, averages, extremes and top-k lists are exact; medians
+        come from KLL sketches and the property listings in the prompt from a
+        uniform random sample (error bounds in api/sketches.py). Memory is
+        bounded by the sample size and the number of distinct locations,
+        types and years. Returns a dict with the context, the sampled rows,
+        the (exact) chart data and, for several `locations`, their exact
+        compare_locations() figures.
+        """
+        seed = settings.APPROX_STATS_SEED
+        prices, demands = RunningStats(), RunningStats()
+        price_quantiles = KLLSketch(settings.APPROX_STATS_KLL_K, seed=seed)
+        demand_quantiles = KLLSketch(settings.APPROX_STATS_KLL_K, seed=seed)
+        sample = Reservoir(settings.APPROX_STATS_SAMPLE_ROWS, seed=seed)
+        top_roi, top_value, top_demand = ranking.TopK('roi', 5), ranking.TopK('value', 5), ranking.TopK('demand', 3)
+        # Per-group totals are plain sums (summed in row order, like the exact statistics)
+        group = lambda: {'count': 0, 'prices': 0, 'price_sum': 0.0, 'min_price': None, 'max_price': None,
+                         'demands': 0, 'demand_sum': 0.0, 'high_demand_count': 0,
+                         'all_price_sum': 0.0, 'all_demand_sum': 0.0}
+        by_type, by_year, by_location = defaultdict(group), defaultdict(group), defaultdict(group)
+        compared = DataProcessingService.comparison_totals(locations) if locations and len(locations) > 1 else None
+        total = 0
+        
+        for prop in rows:
+            total += 1
+            price = prop['price']
+            demand = prop['demand_score']
+            groups = (by_type[prop['property_type']], by_year[prop['year']], by_location[prop['location']])
+            # Same truthiness filters as the exact statistics
+            if price:
+                prices.add(price)
+                price_quantiles.add(price)
+            if demand:
+                demands.add(demand)
+                demand_quantiles.add(demand)
+            for totals in groups:
+                totals['count'] += 1
+                if price:
+                    totals['prices'] += 1
+                    totals['price_sum'] += price
+                    if totals['min_price'] is None or price < totals['min_price']:
+                        totals['min_price'] = price
+                    if totals['max_price'] is None or price > totals['max_price']:
+                        totals['max_price'] = price
+                if demand:
+                    totals['demands'] += 1
+                    totals['demand_sum'] += demand
+                    if demand > 2000:
+                        totals['high_demand_count'] += 1
+                totals['all_price_sum'] += price
+                totals['all_demand_sum'] += demand
+            top_roi.add(prop)
+            top_value.add(prop)
+            top_demand.add(prop)
+            sample.add(prop)
+            if compared is not None:
+                DataProcessingService.add_to_comparison(compared, prop)
+        
+        def avg(totals, field):
+            return totals[f'{field}_sum'] / totals[f'{field}s'] if totals[f'{field}s'] else 0
+        
+        def price_range(totals):
+            return [totals['min_price'], totals['max_price']] if totals['prices'] else [0, 0]
+        
+        price_stats = {}
+        if prices.count:
+            price_stats = {
+                'min': prices.min,
+                'max': prices.max,
+                'avg': prices.mean,
+                'median': price_quantiles.quantile(0.5),
+                'std_dev': prices.stdev
+            }
+        demand_stats = {}
+        if demands.count:
+            median = demand_quantiles.quantile(0.5)
+            demand_stats = {
+                'min': demands.min,
+                'max': demands.max,
+                'avg': demands.mean,
+                'median': median,
+                'high_demand': round(demands.count * (1 - demand_quantiles.rank(median * 1.2)))
+            }
+        
+        years = sorted(by_year)
+        year_analysis = {
+            year: {
+                'count': by_year[year]['count'],
+                'avg_price': avg(by_year[year], 'price'),
+                'avg_demand': avg(by_year[year], 'demand')
+            }
+            for year in years
+        }
+        market_trends = []
+        for year1, year2 in zip(years, years[1:]):
+            if by_year[year1]['prices'] and by_year[year2]['prices']:
+                avg1, avg2 = avg(by_year[year1], 'price'), avg(by_year[year2], 'price')
+                change = ((avg2 - avg1) / avg1) * 100
+                market_trends.append({
+                    'period': f"{year1} to {year2}",
+                    'change_percent': change,
+                    'direction': 'UP' if change > 0 else 'DOWN'
+                })
+        
+        data_context = {
+            'total_properties': total,
+            'locations': list(by_location),
+            'price_stats': price_stats,
+            'demand_stats': demand_stats,
+            'property_types': {
+                ptype: {
+                    'count': totals['count'],
+                    'avg_price': avg(totals, 'price'),
+                    'price_range': price_range(totals)
+                }
+                for ptype, totals in by_type.items()
+            },
+            'year_analysis': year_analysis,
+            'location_comparison': {
+                loc: {
+                    'count': totals['count'],
+                    'avg_price': avg(totals, 'price'),
+                    'min_price': totals['min_price'] or 0,
+                    'max_price': totals['max_price'] or 0,
+                    'price_range': price_range(totals),
+                    'avg_demand': avg(totals, 'demand'),
+                    'high_demand_count': totals['high_demand_count']
+                }
+                for loc, totals in by_location.items()
+            },
+            'investment_insights': [
+                {
+                    'location': prop.get('location'),
+                    'price': float(prop.get('price', 0)),
+                    'demand': float(prop.get('demand_score', 0)),
+                    'roi_score': roi_score,
+                    'investment_rating': 'Excellent' if roi_score > 80 else 'Good' if roi_score > 50 else 'Fair'
+                }
+                for roi_score, prop in top_roi.result()
+            ],
+            'market_trends': market_trends,
+            'top_properties': [{**prop, 'investment_score': score} for score, prop in top_value.result()],
+            'top_demand': [prop for _, prop in top_demand.result()],
+            'approximate': {'rows': total, 'sampleRows': len(sample.items)},
+        }
+        chart_data = [
+            {
+                'year': year,
+                'avgPrice': round(by_year[year]['all_price_sum'] / by_year[year]['count'], 2),
+                'avgDemand': round(by_year[year]['all_demand_sum'] / by_year[year]['count'], 2),
+            }
+            for year in years
+        ]
+        return {
+            'context': (data_context, self._build_data_sections(sample.items, data_context)),
+            'rows': sample.items,
+            'chart_data': chart_data,
+            'comparison': DataProcessingService.comparison_result(compared) if compared is not None else None,
+        }
+    
+    @staticmethod
+    def context_key(location=None, locations=None, dataset=None):
+        """(dataset and location key, data version) identifying the rows a context was built from"""
+        if locations:
+            # Exact names: 'Wakad vs Pune' and 'Pune vs Wakad' share an entry, distinct from a 'Wakad' substring filter
+            name = '|'.join(sorted(name.lower() for name in locations)) + '|'
+        else:
+            name = (location or '').lower()
+        name = f"{dataset or settings.DEFAULT_DATASET}:{name}"
+        return name, DataProcessingService.data_version(location, locations, dataset)
+    
+    def cached_context(self, properties_data, location=None, key=None):
+        """build_context() through the per-process cache, keyed by context_key().
+        
+        Runs a version query, so call it on the request thread, not an LLM worker.
+        """
+        key = key or self.context_key(location)
+        context = data_context_cache.get(key)
+        if context is None:
+            context = self.build_context(properties_data, location)
+            data_context, data_sections = context
+            size = sum(sys.getsizeof(section) for section in data_sections)
+            size += len(json.dumps(data_context, cls=DecimalEncoder))
+            data_context_cache.put(key, context, size)
+        return context
+    
+    def _generate_content(self, prompt):
+        """Send a prompt to Gemini with the project's generation settings"""
+        if settings.LLM_BACKEND == 'stub':
+            from . import llm_stub
+            return llm_stub.generate_content(prompt)
+        
+        import google.generativeai as genai
+        
+        return self.model.generate_content(
+            prompt,
+            generation_config=genai.types.GenerationConfig(
+                temperature=0.8,  # Creative but factual
+                top_p=0.95,
+                top_k=50,
+                max_output_tokens=3000
+            ),
+            safety_settings=[
+                {
+                    "category": genai.types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+                    "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
+                },
+                {
+                    "category": genai.types.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+                    "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
+                },
+                {
+                    "category": genai.types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+                    "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
+                },
+                {
+                    "category": genai.types.HarmCategory.HARM_CATEGORY_HARASSMENT,
+                    "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
+                }
+            ]
+        )
+    
+    @staticmethod
+    def _extract_usage(response):
+        """Read prompt/output token counts from a Gemini response"""
+        usage = getattr(response, 'usage_metadata', None)
+        return {
+            'prompt_tokens': getattr(usage, 'prompt_token_count', 0) or 0,
+            'output_tokens': getattr(usage, 'candidates_token_count', 0) or 0,
+        }
+    
+    @staticmethod
+    def estimate_cost(usage):
+        """Estimate the USD cost of a generation from its token usage"""
+        return (
+            usage['prompt_tokens'] * settings.GEMINI_INPUT_COST_PER_MILLION
+            + usage['output_tokens'] * settings.GEMINI_OUTPUT_COST_PER_MILLION
+        ) / 1_000_000
+    
     def _ensure_json_serializable(self, properties_data):
         """Convert all properties to JSON-serializable format"""
+        # Rows from fetch_rows are already plain floats; rows are homogeneous, so checking one is enough
+        if properties_data and not any(isinstance(value, (Decimal, datetime, date)) for value in properties_data[0].values()):
+            return properties_data
+        
         serializable_data = []
         for prop in properties_data:
             clean_prop = {}
@@ -130,12 +416,13 @@ class GeminiService:
         if not demands:
             return {}
         
+        median = statistics.median(demands)
         return {
             'min': min(demands),
             'max': max(demands),
             'avg': sum(demands) / len(demands),
-            'median': statistics.median(demands),
-            'high_demand': sum(1 for d in demands if d > statistics.median(demands) * 1.2)
+            'median': median,
+            'high_demand': sum(1 for d in demands if d > median * 1.2)
         }
     
     def _categorize_by_type(self, properties_data):
@@ -198,21 +485,15 @@ class GeminiService:
     def _calculate_investment_metrics(self, properties_data):
         """Calculate ROI and investment potential metrics"""
         metrics = []
-        for prop in properties_data:
-            price = float(prop.get('price', 0))
-            demand = float(prop.get('demand_score', 0))
-            
-            if price > 0:
-                roi_score = (demand / price) * 100000  # Normalized score
-                metrics.append({
-                    'location': prop.get('location'),
-                    'price': price,
-                    'demand': demand,
-                    'roi_score': roi_score,
-                    'investment_rating': 'Excellent' if roi_score > 80 else 'Good' if roi_score > 50 else 'Fair'
-                })
-        
-        return sorted(metrics, key=lambda x: x['roi_score'], reverse=True)[:5]
+        for roi_score, prop in ranking.top_k(properties_data, 'roi', 5):
+            metrics.append({
+                'location': prop.get('location'),
+                'price': float(prop.get('price', 0)),
+                'demand': float(prop.get('demand_score', 0)),
+                'roi_score': roi_score,
+                'investment_rating': 'Excellent' if roi_score > 80 else 'Good' if roi_score > 50 else 'Fair'
+            })
+        return metrics
     
     def _identify_trends(self, properties_data):
         """Identify market trends from year-over-year data"""
@@ -246,15 +527,17 @@ class GeminiService:
     
     def _identify_top_properties(self, properties_data):
         """Identify top performing properties"""
-        ranked = []
-        for prop in properties_data:
-            score = (float(prop.get('demand_score', 0)) * 0.6) - (float(prop.get('price', 0)) / 100000 * 0.4)
-            ranked.append({**prop, 'investment_score': score})
-        
-        return sorted(ranked, key=lambda x: x['investment_score'], reverse=True)[:5]
+        # Only the winners are copied, not every property
+        return [
+            {**prop, 'investment_score': score}
+            for score, prop in ranking.top_k(properties_data, 'value', 5)
+        ]
     
-    def _build_intelligent_prompt(self, user_query, properties_data, data_context, query_type, location):
-        """Build a smart prompt that gets the best out of Gemini"""
+    def _build_data_sections(self, properties_data, data_context):
+        """Render the data part of the prompt, which depends only on the data (not the question).
+        
+        Returns (digest, details): the aggregate sections and the property-level listings.
+        """
         
         # Create a comprehensive data summary for context
         locations_list = data_context['locations']
@@ -274,12 +557,11 @@ class GeminiService:
         for trend in data_context['market_trends']:
             trend_insights += f"\n- {trend['period']}: {trend['direction']} {abs(trend['change_percent']):.1f}%"
         
-        # Get top 3 highest demand properties with details
-        top_demand_props = sorted(
-            [p for p in properties_data],
-            key=lambda x: float(x.get('demand_score', 0)),
-            reverse=True
-        )[:3]
+        # Get top 3 highest demand properties with details (precomputed when properties_data is a sample)
+        if 'top_demand' in data_context:
+            top_demand_props = data_context['top_demand']
+        else:
+            top_demand_props = [prop for _, prop in ranking.top_k(properties_data, 'demand', 3)]
         
         top_demand_str = ""
         for i, prop in enumerate(top_demand_props, 1):
@@ -317,23 +599,16 @@ class GeminiService:
         
         high_performing_json = json.dumps(high_performing, indent=2, cls=DecimalEncoder)
         
-        prompt = f"""You are a WORLD-CLASS real estate market analyst and investment advisor.
-You MUST provide SPECIFIC, DATA-DRIVEN answers that directly address the user's question.
-
-USER QUERY: "{user_query}"
-
-RESPONSE GUIDELINES:
-✓ DIRECTLY answer what was asked - don't give generic market summaries
-✓ CITE SPECIFIC properties, locations, and numbers
-✓ Sound like an expert advisor giving personalized insights
-✓ When asked "What's the highest demand property?" - TELL THEM THE NAME, DEMAND SCORE, and PRICE
-✓ When asked "list all areas" - Give EACH area with metrics, not just names
-✓ When asked for "trends" - Explain what's happening and WHY
-✓ NEVER respond with just "Analysis of X properties - Average Price: $Y"
-✓ Make every response valuable and specific to THEIR question
-✓ Use comparisons and insights to help them understand the market
-
-MARKET DATA CONTEXT:
+        high_performing_title = "HIGH-PERFORMING PROPERTIES (Above Average Demand)"
+        database_title = "COMPLETE PROPERTY DATABASE"
+        if 'approximate' in data_context:
+            high_performing_title += " - FROM THE SAMPLE BELOW"
+            database_title = (
+                f"RANDOM SAMPLE OF {len(properties_data)} OF {data_context['total_properties']} PROPERTIES "
+                "(medians above are estimates, other figures cover every property)"
+            )
+        
+        digest = f"""MARKET DATA CONTEXT:
 
 MARKET OVERVIEW:
 - Total Properties: {data_context['total_properties']}
@@ -357,22 +632,83 @@ TOP INVESTMENT OPPORTUNITIES:
 {investment_picks}
 
 MARKET TRENDS:
-{trend_insights}
-
-HIGH-PERFORMING PROPERTIES (Above Average Demand):
+{trend_insights}"""
+        details = f"""{high_performing_title}:
 {high_performing_json}
 
-COMPLETE PROPERTY DATABASE:
-{property_db_json}
+{database_title}:
+{property_db_json}"""
+        return digest, details
+    
+    def _build_intelligent_prompt(self, user_query, data_sections):
+        """Build a smart prompt that gets the best out of Gemini"""
+        data = "\n\n".join(data_sections)
+        return f"""You are a WORLD-CLASS real estate market analyst and investment advisor.
+You MUST provide SPECIFIC, DATA-DRIVEN answers that directly address the user's question.
+
+USER QUERY: "{user_query}"
+
+RESPONSE GUIDELINES:
+✓ DIRECTLY answer what was asked - don't give generic market summaries
+✓ CITE SPECIFIC properties, locations, and numbers
+✓ Sound like an expert advisor giving personalized insights
+✓ When asked "What's the highest demand property?" - TELL THEM THE NAME, DEMAND SCORE, and PRICE
+✓ When asked "list all areas" - Give EACH area with metrics, not just names
+✓ When asked for "trends" - Explain what's happening and WHY
+✓ NEVER respond with just "Analysis of X properties - Average Price: $Y"
+✓ Make every response valuable and specific to THEIR question
+✓ Use comparisons and insights to help them understand the market
+
+{data}
 
 Remember: Answer the SPECIFIC question asked with SPECIFIC data. No generic responses."""
-        return prompt
+    
+    def _build_followup_prompt(self, user_query, history, data_sections, include_details):
+        """Prompt for a follow-up turn: earlier turns plus only the data this session hasn't sent"""
+        digest, details = data_sections
+        conversation = "\n\n".join(
+            f"Q{i}: {turn['query']}\nA{i}: {turn['answer']}" for i, turn in enumerate(history, 1)
+        )
+        if include_details:
+            data = f"{digest}\n\n{details}"
+        else:
+            data = f"{digest}\n\n(Property-level listings were used for the earlier answers and are omitted here.)"
+        
+        return f"""You are a WORLD-CLASS real estate market analyst and investment advisor.
+You MUST provide SPECIFIC, DATA-DRIVEN answers that directly address the user's question.
+
+This is a follow-up question in an ongoing conversation.
+
+CONVERSATION SO FAR:
+{conversation}
+
+{data}
+
+FOLLOW-UP QUERY: "{user_query}"
+
+Answer the follow-up directly and stay consistent with your earlier answers. Cite specific locations and numbers."""
     
     def _calc_avg_price(self, properties_data):
         """Helper to calculate average price"""
         prices = [float(p.get('price', 0)) for p in properties_data if p.get('price')]
         return sum(prices) / len(prices) if prices else 0
     
+    def generate_local_summary(self, properties_data, location=None, query=None, query_type=None):
+        """Answer from the data alone, without calling Gemini"""
+        if not properties_data:
+            return "No data available for the given query."
+        properties_data = self._ensure_json_serializable(properties_data)
+        analyzer = getattr(self, self.LOCAL_ANALYZERS.get(query_type, '_generate_general_analysis'))
+        return analyzer(properties_data, location, query)
+    
+    @staticmethod
+    def _avg(values):
+        return sum(values) / len(values) if values else 0
+    
+    @staticmethod
+    def _format_property_line(prop):
+        return f"{prop.get('location', 'N/A')} | Year: {prop.get('year')} | Price: ${float(prop.get('price') or 0):,.0f} | Demand: {float(prop.get('demand_score') or 0):.0f}"
+    
     def _format_property_listing(self, properties_data, location=None):
         """Format properties as a clean listing"""
         summary = f"**Properties in {location or 'Database'}** ({len(properties_data)} total)\n\n"
@@ -381,10 +717,13 @@ Remember: Answer the SPECIFIC question asked with SPECIFIC data. No generic resp
         for prop in properties_data:
             by_type[prop.get('property_type', 'Residential')].append(prop)
         
+        limit = settings.LOCAL_LISTING_LIMIT
         for ptype, props in sorted(by_type.items()):
             summary += f"**{ptype}** ({len(props)})\n"
-            for i, prop in enumerate(props, 1):
-                summary += f"{i}. {prop.get('location', 'N/A')} | Year: {prop.get('year')} | Price: ${prop.get('price', 0):,.0f} | Demand: {prop.get('demand_score', 0):.0f}\n"
+            for i, prop in enumerate(props[:limit], 1):
+                summary += f"{i}. {self._format_property_line(prop)}\n"
+            if len(props) > limit:
+                summary += f"...and {len(props) - limit} more (see the table below)\n"
             summary += "\n"
         
         # Add summary stats
@@ -393,12 +732,36 @@ Remember: Answer the SPECIFIC question asked with SPECIFIC data. No generic resp
         
         if prices:
             summary += "**Summary Stats:**\n"
-            summary += f"- Avg Price: ${sum(prices)/len(prices):,.0f}\n"
+            summary += f"- Avg Price: ${self._avg(prices):,.0f}\n"
             summary += f"- Price Range: ${min(prices):,.0f} - ${max(prices):,.0f}\n"
-            summary += f"- Avg Demand: {sum(demands)/len(demands):.0f}\n"
+            summary += f"- Avg Demand: {self._avg(demands):.0f}\n"
         
         return summary
     
+    def _generate_listing(self, properties_data, location, query):
+        """Listing queries"""
+        return self._format_property_listing(properties_data, location)
+    
+    def _generate_stats_summary(self, properties_data, location, query):
+        """Direct answers to simple statistics questions"""
+        price_stats = self._calculate_price_stats(properties_data)
+        demand_stats = self._calculate_demand_stats(properties_data)
+        years = [p.get('year') for p in properties_data if p.get('year')]
+        
+        summary = f"**Market Statistics for {location or 'All Locations'}**\n\n"
+        summary += f"- Properties: {len(properties_data)}\n"
+        summary += f"- Locations: {len(set(p.get('location') for p in properties_data))}\n"
+        if years:
+            summary += f"- Years Covered: {min(years)} - {max(years)}\n"
+        if price_stats:
+            summary += f"- Avg Price: ${price_stats['avg']:,.0f}\n"
+            summary += f"- Median Price: ${price_stats['median']:,.0f}\n"
+            summary += f"- Price Range: ${price_stats['min']:,.0f} - ${price_stats['max']:,.0f}\n"
+        if demand_stats:
+            summary += f"- Avg Demand Score: {demand_stats['avg']:.0f}\n"
+            summary += f"- Highest Demand Score: {demand_stats['max']:.0f}\n"
+        return summary
+    
     def _generate_comparison_analysis(self, properties_data, location, query):
         """Compare locations or property types"""
         summary = f"**Comparison Analysis**\n\n"
@@ -414,9 +777,10 @@ Remember: Answer the SPECIFIC question asked with SPECIFIC data. No generic resp
             
             summary += f"\n**{loc}**\n"
             summary += f"- Properties: {len(props)}\n"
-            summary += f"- Avg Price: ${sum(prices)/len(prices):,.0f}\n"
-            summary += f"- Price Range: ${min(prices):,.0f} - ${max(prices):,.0f}\n"
-            summary += f"- Avg Demand: {sum(demands)/len(demands):.0f}\n"
+            summary += f"- Avg Price: ${self._avg(prices):,.0f}\n"
+            if prices:
+                summary += f"- Price Range: ${min(prices):,.0f} - ${max(prices):,.0f}\n"
+            summary += f"- Avg Demand: {self._avg(demands):.0f}\n"
             summary += f"- High Demand: {sum(1 for d in demands if d > 2000)} properties\n"
         
         return summary
@@ -437,8 +801,8 @@ Remember: Answer the SPECIFIC question asked with SPECIFIC data. No generic resp
             
             summary += f"\n{year}:\n"
             summary += f"- {len(props)} properties\n"
-            summary += f"- Avg Price: ${sum(prices)/len(prices):,.0f}\n"
-            summary += f"- Avg Demand: {sum(demands)/len(demands):.0f}\n"
+            summary += f"- Avg Price: ${self._avg(prices):,.0f}\n"
+            summary += f"- Avg Demand: {self._avg(demands):.0f}\n"
         
         # Add trend insight
         sorted_years = sorted(by_year.keys())
@@ -467,24 +831,24 @@ Remember: Answer the SPECIFIC question asked with SPECIFIC data. No generic resp
             price = float(prop.get('price', 0))
             demand = float(prop.get('demand_score', 0))
             # Value = high demand + low price
-            score = (demand / avg_demand) - (price / avg_price)
+            score = (demand / avg_demand if avg_demand else 0) - (price / avg_price if avg_price else 0)
             value_score.append((prop, score))
         
         value_score.sort(key=lambda x: x[1], reverse=True)
         
         summary += "**Top Value Picks** (High Demand + Affordable):\n"
         for prop, score in value_score[:5]:
-            summary += f"- {prop.get('location')} | ${prop.get('price', 0):,.0f} | Demand: {prop.get('demand_score', 0):.0f}\n"
+            summary += f"- {prop.get('location')} | ${float(prop.get('price') or 0):,.0f} | Demand: {float(prop.get('demand_score') or 0):.0f}\n"
         
         summary += "\n**Premium Segment** (High Price + High Demand):\n"
         premium = [p for p in value_score if float(p[0].get('price', 0)) > avg_price and float(p[0].get('demand_score', 0)) > avg_demand]
         for prop, score in premium[:3]:
-            summary += f"- {prop.get('location')} | ${prop.get('price', 0):,.0f} | Demand: {prop.get('demand_score', 0):.0f}\n"
+            summary += f"- {prop.get('location')} | ${float(prop.get('price') or 0):,.0f} | Demand: {float(prop.get('demand_score') or 0):.0f}\n"
         
         summary += "\n**Budget Options** (Low Price):\n"
         budget = sorted(value_score, key=lambda x: float(x[0].get('price', 0)))[:3]
         for prop, score in budget:
-            summary += f"- {prop.get('location')} | ${prop.get('price', 0):,.0f} | Demand: {prop.get('demand_score', 0):.0f}\n"
+            summary += f"- {prop.get('location')} | ${float(prop.get('price') or 0):,.0f} | Demand: {float(prop.get('demand_score') or 0):.0f}\n"
         
         return summary
     
@@ -496,6 +860,68 @@ Remember: Answer the SPECIFIC question asked with SPECIFIC data. No generic resp
 class QueryClassifier:
     """Classify user queries to determine how to handle them"""
     
+    INTENTS = ('listing', 'comparison', 'trend', 'recommendation', 'general')
+    
+    # Representative question per intent, used to pre-generate summaries
+    CANONICAL_QUERIES = {
+        'listing': 'Show me all properties in {location} with their key details',
+        'comparison': 'Compare prices and demand across {location}',
+        'trend': 'What are the price and demand trends over the years in {location}?',
+        'recommendation': 'What are the best investment opportunities in {location}?',
+        'general': 'Give me an overview of the real estate market in {location}',
+    }
+    
+    # Matched as whole words. 'mean' is left out: "what does X mean" is not a stats question
+    STAT_KEYWORDS = [
+        'average', 'avg', 'median', 'how many', 'count', 'number of',
+        'minimum', 'maximum', 'price range', 'statistics', 'stats'
+    ]
+    LISTING_KEYWORDS = ['list', 'show', 'all properties']
+    
+    # Questions asking to compare, follow a trend, judge or explain need Gemini
+    ANALYSIS_KEYWORDS = [
+        'compare', 'comparison', 'compared', 'vs', 'versus', 'better', 'which', 'difference', 'between',
+        'trend', 'trends', 'growth', 'increase', 'decrease', 'over time', 'historical', 'year', 'years',
+        'recommend', 'recommendation', 'best', 'invest', 'investment', 'investing', 'buy', 'should',
+        'worth', 'risk', 'risks', 'why', 'explain', 'what does',
+    ]
+    
+    @staticmethod
+    def local_intent(query_text, query_type, mentions=0):
+        """Return the local analyzer for queries simple enough to skip Gemini, else None.
+        
+        Only plain statistics or explicit list/show requests naming at most one
+        place (`mentions`, see DataProcessingService.parse_query) qualify; any
+        comparison, trend or recommendation signal sends the question to Gemini.
+        """
+        query_lower = query_text.lower()
+        
+        def uses(keywords):
+            return any(_find_word(query_lower, word) != -1 for word in keywords)
+        
+        if mentions > 1 or uses(QueryClassifier.ANALYSIS_KEYWORDS):
+            return None
+        if uses(QueryClassifier.STAT_KEYWORDS):
+            return 'stats'
+        if query_type == 'listing' and uses(QueryClassifier.LISTING_KEYWORDS):
+            return 'listing'
+        return None
+    
+    @staticmethod
+    def matches_canonical(query_text, query_type, locations=()):
+        """Whether the query is (nearly) the canonical question of its intent.
+        
+        Location names are dropped from both sides, so "What are the best
+        investment opportunities in Baner?" matches the recommendation question
+        for any location, while other questions that merely share its intent do not.
+        """
+        query_lower = query_text.lower()
+        for name in sorted(locations, key=len, reverse=True):
+            query_lower = query_lower.replace(name.lower(), ' ')
+        words = re.findall(r'\w+', query_lower)
+        canonical = re.findall(r'\w+', QueryClassifier.CANONICAL_QUERIES[query_type].format(location='').lower())
+        return difflib.SequenceMatcher(None, words, canonical).ratio() >= settings.PREWARM_MATCH_RATIO
+    
     @staticmethod
     def classify(query_text):
         """Classify query type and extract intent"""
@@ -563,35 +989,205 @@ class QueryClassifier:
             return f"Error generating summary: {str(e)}"
 
 
+# Columns loaded for analysis; matches the shared dataset file's columns
+PROPERTY_ROW_FIELDS = (
+    'id', 'location', 'property_type', 'price', 'price_per_sqft',
+    'area_sqft', 'year', 'demand', 'demand_score'
+)
+DECIMAL_FIELDS = {'price', 'price_per_sqft', 'area_sqft'}
+
+
+def _find_word(text, phrase):
+    """Index of the first whole-word occurrence of `phrase` in `text`, or -1"""
+    start = text.find(phrase)
+    while start != -1:
+        end = start + len(phrase)
+        if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+            return start
+        start = text.find(phrase, start + 1)
+    return -1
+
+
 class DataProcessingService:
+    # Common locations to check
+    COMMON_LOCATIONS = [
+        'wakad', 'pune', 'bengaluru', 'bangalore', 'mumbai', 'delhi',
+        'gurgaon', 'noida', 'hyderabad', 'kolkata', 'ahmedabad', 'jaipur'
+    ]
+    
     @staticmethod
-    def parse_query(query_text):
-        """Parse user query to extract location and analysis type"""
+    def parse_query(query_text, dataset=None):
+        """Parse user query to extract locations and analysis type.
+        
+        Every loaded location or common city the query names selects each loaded
+        location containing it ('Wakad' -> 'Wakad', 'Wakad Phase 2'; 'Pune' ->
+        'Pune Camp'), the same rows the substring `location` filter of the
+        property endpoints returns. `locations` lists them in the order mentioned
+        and is filtered on exactly; `location` is the display name of the filter
+        ('Wakad, Pune Camp' for several). `mentions` counts the distinct places
+        named, so 'Wakad' alone is one place however many locations contain it;
+        comparisons and the local fast path go by it. Common cities with no loaded location
+        are listed in `unmatched`; when nothing matched, the first one is kept as
+        a substring filter in `location` alone. Locations are looked up in
+        `dataset` (a name; None for DEFAULT_DATASET).
+        """
         query_lower = query_text.lower()
+        index = DataProcessingService.location_index(dataset=dataset)
         
-        # Common locations to check
-        locations = [
-            'wakad', 'pune', 'bengaluru', 'bangalore', 'mumbai', 'delhi',
-            'gurgaon', 'noida', 'hyderabad', 'kolkata', 'ahmedabad', 'jaipur'
-        ]
+        def containing(term):
+            return [name for name in index if term in name.lower()]
         
-        extracted_location = None
-        for loc in locations:
-            if loc in query_lower:
-                extracted_location = loc.capitalize()
-                break
+        matches = []  # (start, end, term, names)
+        for name in index:
+            start = _find_word(query_lower, name.lower())
+            if start != -1:
+                matches.append((start, start + len(name), name.lower(), containing(name.lower())))
+        unmatched = []
+        for loc in DataProcessingService.COMMON_LOCATIONS:
+            start = _find_word(query_lower, loc)
+            if start == -1:
+                continue
+            names = containing(loc)
+            if names:
+                matches.append((start, start + len(loc), loc, names))
+            else:
+                unmatched.append((start, loc.capitalize()))
+        
+        # 'Wakad Phase 2' also contains 'Wakad'; keep only the longest of overlapping matches
+        matches.sort(key=lambda match: (match[0], -match[1]))
+        extracted_locations = []
+        mentioned = set()
+        covered_until = -1
+        for start, end, term, names in matches:
+            if start >= covered_until:
+                extracted_locations.extend(name for name in names if name not in extracted_locations)
+                mentioned.add(term)
+                covered_until = end
+        unmatched = [name for _, name in sorted(unmatched)]
         
         return {
-            'location': extracted_location,
+            'location': ', '.join(extracted_locations) or (unmatched[0] if unmatched else None),
+            'locations': extracted_locations,
+            'mentions': len(mentioned),
+            'unmatched': unmatched,
             'query': query_text
         }
     
     @staticmethod
-    def filter_properties(location=None, property_type=None, year_range=None):
-        """Filter properties based on criteria"""
-        queryset = Property.objects.all()
+    def dataset_id(dataset=None):
+        """Id of the dataset named `dataset` (None for DEFAULT_DATASET), or None if it doesn't exist.
+        
+        Cached for LOCATION_INDEX_TTL seconds; ids don't change when a dataset is reloaded.
+        """
+        name = dataset or settings.DEFAULT_DATASET
+        dataset_id = cache.get(f'dataset_id:{name}')
+        if dataset_id is None:
+            dataset_id = Dataset.objects.filter(name=name).values_list('id', flat=True).first()
+            if dataset_id is not None:
+                cache.set(f'dataset_id:{name}', dataset_id, settings.LOCATION_INDEX_TTL)
+        return dataset_id
+    
+    @staticmethod
+    def location_index(refresh=False, dataset=None):
+        """Sorted distinct locations of a dataset, cached for LOCATION_INDEX_TTL seconds"""
+        key = f'location_index:{dataset or settings.DEFAULT_DATASET}'
+        locations = None if refresh else cache.get(key)
+        if locations is None:
+            locations = list(
+                DataProcessingService.filter_properties(dataset=dataset)
+                .order_by('location').values_list('location', flat=True).distinct()
+            )
+            cache.set(key, locations, settings.LOCATION_INDEX_TTL)
+        return locations
+    
+    @staticmethod
+    def replace_properties(properties, dataset=None, source=None):
+        """Replace the properties of `dataset` (created if new) with `properties` without blocking other writers.
+        
+        The new rows are staged as the dataset's next version in batches of
+        RELOAD_BATCH_ROWS, each committed on its own, so the database write lock
+        (all of it, on SQLite) is only held for one batch at a time. One short
+        transaction then makes that version the live one; readers resolve the
+        version in the same statement as their rows, so they see either the old
+        or the new dataset, never a mix. The old rows are deleted in batches
+        afterwards. If staging fails, the staged rows are removed and the old
+        data stays live. Other datasets are not touched. `source` (e.g. the
+        file loaded) replaces the recorded one when given. Returns the Dataset.
+        """
+        name = dataset or settings.DEFAULT_DATASET
+        dataset_obj, _ = Dataset.objects.get_or_create(name=name)
+        with transaction.atomic():
+            Dataset.objects.filter(pk=dataset_obj.pk).update(staged_version=F('staged_version') + 1)
+            version = Dataset.objects.filter(pk=dataset_obj.pk).values_list('staged_version', flat=True).get()
+        
+        try:
+            for start in range(0, len(properties), settings.RELOAD_BATCH_ROWS):
+                batch = properties[start:start + settings.RELOAD_BATCH_ROWS]
+                for prop in batch:
+                    prop.dataset = dataset_obj
+                    prop.version = version
+                Property.objects.bulk_create(batch)
+                DataProcessingService._yield_write_lock()
+        except BaseException:
+            DataProcessingService._delete_properties(dataset_obj, Q(version=version))
+            raise
+        
+        fields = {'version': version, 'row_count': len(properties), 'updated_at': timezone.now()}
+        if source is not None:
+            fields['source'] = source
+        with transaction.atomic():
+            # A reload that staged a later version and already swapped it in wins
+            swapped = Dataset.objects.filter(pk=dataset_obj.pk, version__lt=version).update(**fields)
+            if swapped:
+                # Summaries generated from the old data are now stale
+                PrewarmedSummary.objects.filter(dataset=dataset_obj).delete()
+        # Older versions, including rows left behind by a reload that crashed; or ours if we lost
+        DataProcessingService._delete_properties(dataset_obj, Q(version__lt=version) if swapped else Q(version=version))
+        
+        dataset_obj.refresh_from_db()
+        cache.set(f'dataset_id:{name}', dataset_obj.id, settings.LOCATION_INDEX_TTL)
+        DataProcessingService.location_index(refresh=True, dataset=name)
+        return dataset_obj
+    
+    @staticmethod
+    def _delete_properties(dataset_obj, versions):
+        """Delete the dataset's properties matching `versions` (a Q), one batch per transaction"""
+        queryset = Property.objects.filter(versions, dataset=dataset_obj)
+        while True:
+            ids = queryset.order_by().values('id')[:settings.RELOAD_BATCH_ROWS]
+            deleted, _ = Property.objects.filter(id__in=Subquery(ids)).delete()
+            if not deleted:
+                break
+            DataProcessingService._yield_write_lock()
+    
+    @staticmethod
+    def _yield_write_lock():
+        """Pause between reload batches so writers waiting for SQLite's single write lock get it"""
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            time.sleep(settings.RELOAD_BATCH_PAUSE_MS / 1000)
+    
+    @staticmethod
+    def filter_properties(location=None, property_type=None, year_range=None, locations=None, dataset=None):
+        """Filter properties based on criteria.
+        
+        Only rows of `dataset` (a name; None for DEFAULT_DATASET) are considered.
+        `locations` (exact names, an indexed IN lookup) takes precedence over
+        `location` (case-insensitive substring). Both select the same rows for
+        a location name: parse_query resolves a name to every loaded location
+        containing it.
+        """
+        dataset_id = DataProcessingService.dataset_id(dataset)
+        if dataset_id is None:
+            return Property.objects.none()
+        queryset = Property.objects.filter(
+            dataset_id=dataset_id,
+            # Resolved in the same statement, so a reload swapping versions never shows a mix of both
+            version=Subquery(Dataset.objects.filter(id=dataset_id).order_by().values('version')[:1]),
+        )
         
-        if location:
+        if locations:
+            queryset = queryset.filter(location__in=locations)
+        elif location:
             queryset = queryset.filter(location__icontains=location)
         
         if property_type:
@@ -603,12 +1199,53 @@ class DataProcessingService:
         return queryset
     
     @staticmethod
-    def prepare_chart_data(properties):
+    def fetch_rows(location=None, locations=None, dataset=None):
+        """Load the filtered properties as dicts in a single query"""
+        if settings.USE_SHARED_DATASET:
+            # Served from the memory-mapped export shared by all workers on this host
+            from .dataset_file import get_shared_dataset  # numpy is only needed on this path
+            
+            shared = get_shared_dataset(dataset)
+            if shared is not None:
+                return shared.fetch_rows(location=location, locations=locations)
+        return DataProcessingService.float_rows(
+            DataProcessingService.filter_properties(location=location, locations=locations, dataset=dataset)
+        )
+    
+    @staticmethod
+    def data_version(location=None, locations=None, dataset=None):
+        """A value that changes whenever the rows fetch_rows(location, locations, dataset) returns may have changed"""
+        if settings.USE_SHARED_DATASET:
+            from .dataset_file import get_shared_dataset
+            
+            shared = get_shared_dataset(dataset)
+            if shared is not None:
+                return shared.identity
+        version = DataProcessingService.filter_properties(
+            location=location, locations=locations, dataset=dataset
+        ).aggregate(count=Count('id'), updated=Max('updated_at'))
+        return version['count'], version['updated']
+    
+    @staticmethod
+    def float_values_list(queryset, fields=PROPERTY_ROW_FIELDS):
+        """values_list() with DecimalFields cast to float in SQL, so no Decimal is built per row"""
+        return queryset.values_list(*[
+            Cast(field, FloatField()) if field in DECIMAL_FIELDS else field
+            for field in fields
+        ])
+    
+    @staticmethod
+    def float_rows(queryset, fields=PROPERTY_ROW_FIELDS):
+        """Rows as dicts shaped like .values(fields), with float instead of Decimal"""
+        return [dict(zip(fields, row)) for row in DataProcessingService.float_values_list(queryset, fields)]
+    
+    @staticmethod
+    def prepare_chart_data(rows):
         """Prepare data for chart visualization"""
         data_by_year = {}
         
-        for prop in properties:
-            year = prop.year
+        for prop in rows:
+            year = prop['year']
             if year not in data_by_year:
                 data_by_year[year] = {
                     'year': year,
@@ -617,8 +1254,8 @@ class DataProcessingService:
                     'count': 0,
                 }
             
-            data_by_year[year]['avgPrice'] += float(prop.price)
-            data_by_year[year]['avgDemand'] += float(prop.demand_score)
+            data_by_year[year]['avgPrice'] += prop['price']
+            data_by_year[year]['avgDemand'] += prop['demand_score']
             data_by_year[year]['count'] += 1
         
         # Calculate averages
@@ -631,18 +1268,514 @@ class DataProcessingService:
         return sorted(data_by_year.values(), key=lambda x: x['year'])
     
     @staticmethod
-    def prepare_table_data(properties):
-        """Prepare data for table display"""
-        table_data = []
-        for prop in properties:
-            table_data.append({
-                'location': prop.location,
-                'type': prop.property_type,
-                'price': float(prop.price),
-                'pricePerSqft': float(prop.price_per_sqft) if prop.price_per_sqft else None,
-                'area': float(prop.area_sqft) if prop.area_sqft else None,
-                'year': prop.year,
-                'demand': prop.demand,
-                'demandScore': float(prop.demand_score),
+    def prepare_table_data(rows):
+        """Prepare data for table display (rows from fetch_rows already hold floats)"""
+        return [
+            {
+                'location': prop['location'],
+                'type': prop['property_type'],
+                'price': prop['price'],
+                'pricePerSqft': prop['price_per_sqft'] or None,
+                'area': prop['area_sqft'] or None,
+                'year': prop['year'],
+                'demand': prop['demand'],
+                'demandScore': prop['demand_score'],
+            }
+            for prop in rows
+        ]
+    
+    @staticmethod
+    def compare_locations(rows, locations):
+        """Per-location figures for `locations`, side by side, in one pass over the rows"""
+        totals = DataProcessingService.comparison_totals(locations)
+        for prop in rows:
+            DataProcessingService.add_to_comparison(totals, prop)
+        return DataProcessingService.comparison_result(totals)
+    
+    @staticmethod
+    def comparison_totals(locations):
+        """Empty running totals for compare_locations(), fed row by row with add_to_comparison()"""
+        return {
+            location: {'count': 0, 'price': 0.0, 'minPrice': None, 'maxPrice': None,
+                       'demand': 0.0, 'pricePerSqft': 0.0, 'pricePerSqftCount': 0}
+            for location in locations
+        }
+    
+    @staticmethod
+    def add_to_comparison(totals, prop):
+        total = totals.get(prop['location'])
+        if total is None:
+            return
+        price = prop['price']
+        total['count'] += 1
+        total['price'] += price
+        total['demand'] += prop['demand_score']
+        if total['minPrice'] is None or price < total['minPrice']:
+            total['minPrice'] = price
+        if total['maxPrice'] is None or price > total['maxPrice']:
+            total['maxPrice'] = price
+        if prop['price_per_sqft']:
+            total['pricePerSqft'] += prop['price_per_sqft']
+            total['pricePerSqftCount'] += 1
+    
+    @staticmethod
+    def comparison_result(totals):
+        return [
+            {
+                'location': location,
+                'count': total['count'],
+                'avgPrice': round(total['price'] / total['count'], 2) if total['count'] else None,
+                'minPrice': total['minPrice'],
+                'maxPrice': total['maxPrice'],
+                'avgPricePerSqft': (
+                    round(total['pricePerSqft'] / total['pricePerSqftCount'], 2) if total['pricePerSqftCount'] else None
+                ),
+                'avgDemand': round(total['demand'] / total['count'], 2) if total['count'] else None,
+            }
+            for location, total in totals.items()
+        ]
+
+
+# Runs Gemini calls that have a deadline; admission control already bounds how many are in flight
+_llm_executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_CONCURRENCY, thread_name_prefix='llm')
+
+
+class AnalysisService:
+    """The analyze pipeline, shared by the synchronous endpoint and background jobs"""
+    
+    @staticmethod
+    def prepare(user_query, dataset=None, session=None):
+        """Classify the query and build its chart/table data from `dataset` (no LLM call).
+        
+        In a ConversationSession, a follow-up that names no location ("What are
+        the risks there?") stays on the locations of the previous turn.
+        """
+        # INTELLIGENT QUERY CLASSIFICATION
+        query_type = QueryClassifier.classify(user_query)
+        
+        # Parse locations from query
+        parsed = DataProcessingService.parse_query(user_query, dataset)
+        location = parsed['location']
+        locations = parsed['locations']
+        mentions = parsed['mentions']
+        if session is not None and location is None:
+            previous = ConversationService.previous_locations(session, dataset)
+            if previous is not None:
+                location, locations, mentions = previous
+        
+        result = {
+            'query_type': query_type,
+            'dataset': dataset,
+            'location': location,
+            'locations': locations,
+            # Places named in the query; 'Wakad' is one even with 'Wakad Phase 2' in `locations`
+            'mentions': mentions,
+            'unmatched': parsed['unmatched'],
+            'rows': None,
+            'chart_data': None,
+            'table_data': None,
+            'comparison': None,
+            # Rows matched, also when only a sample of them is in `rows`
+            'count': 0,
+            # Set when the statistics come from a streaming pass (see _prepare_approximate)
+            'approximate': None,
+            'context': None,
+            'context_key': None,
+        }
+        if settings.APPROX_STATS_MIN_ROWS and not settings.USE_SHARED_DATASET:
+            # The data version includes the row count, so this costs no extra query
+            key = GeminiService.context_key(location, locations, dataset)
+            if key[1][0] >= settings.APPROX_STATS_MIN_ROWS:
+                return AnalysisService._prepare_approximate(result, key)
+            result['context_key'] = key
+        
+        # Filter properties, fetching the rows once for chart, table and summary
+        rows = DataProcessingService.fetch_rows(location=location, locations=locations, dataset=dataset)
+        result['rows'] = rows
+        result['count'] = len(rows)
+        if rows:
+            # Prepare chart and table data
+            result['chart_data'] = DataProcessingService.prepare_chart_data(rows)
+            result['table_data'] = DataProcessingService.prepare_table_data(rows)
+            if mentions > 1:
+                result['comparison'] = DataProcessingService.compare_locations(rows, locations)
+        return result
+    
+    @staticmethod
+    def _prepare_approximate(result, key):
+        """Fill `result` from one streaming pass instead of loading every row.
+        
+        The table shows the random sample, the chart and comparison are exact.
+        Snapshots are cached like data contexts, so a repeated question about
+        the same data does not scan it again.
+        """
+        cache_key = ('approximate',) + key
+        snapshot = data_context_cache.get(cache_key)
+        if snapshot is None:
+            queryset = DataProcessingService.filter_properties(
+                location=result['location'], locations=result['locations'], dataset=result['dataset']
+            ).order_by()
+            rows = (
+                dict(zip(PROPERTY_ROW_FIELDS, row))
+                for row in DataProcessingService.float_values_list(queryset).iterator(
+                    chunk_size=settings.APPROX_STATS_CHUNK_SIZE
+                )
+            )
+            snapshot = GeminiService().build_approximate_context(rows, result['locations'])
+            data_context, data_sections = snapshot['context']
+            size = sum(sys.getsizeof(section) for section in data_sections)
+            size += len(json.dumps(data_context, cls=DecimalEncoder))
+            data_context_cache.put(cache_key, snapshot, size)
+        
+        result.update({
+            'rows': snapshot['rows'],
+            'chart_data': snapshot['chart_data'],
+            'table_data': DataProcessingService.prepare_table_data(snapshot['rows']),
+            'count': snapshot['context'][0]['approximate']['rows'],
+            'approximate': snapshot['context'][0]['approximate'],
+            'context': snapshot['context'],
+            'context_key': key,
+            # The snapshot is shared by every query over these locations, however many places it named
+            'comparison': snapshot['comparison'] if result['mentions'] > 1 else None,
+        })
+        return result
+    
+    @staticmethod
+    def prewarmed_summary(user_query, location, locations, query_type, dataset=None):
+        """Return the pre-warmed summary for this location and intent in `dataset`, if any.
+        
+        Only served when `user_query` is close to the canonical question it was
+        generated for; anything else about the same location gets its own answer.
+        """
+        if not settings.SERVE_PREWARMED_SUMMARIES:
+            return None
+        if not QueryClassifier.matches_canonical(user_query, query_type, locations):
+            return None
+        dataset_id = DataProcessingService.dataset_id(dataset)
+        if dataset_id is None:
+            return None
+        return PrewarmedSummary.objects.filter(
+            dataset_id=dataset_id,
+            location_filter__iexact=location or 'all',
+            query_type=query_type
+        ).values_list('summary', flat=True).first()
+    
+    @staticmethod
+    def summarize(user_query, prepared, admission=None, deadline=None, session=None):
+        """Return (summary, source) for a prepared query.
+        
+        source is 'local' for simple queries answered without Gemini,
+        'prewarmed', 'llm', or 'local_fallback' when Gemini errored or missed
+        `deadline` seconds. With an AdmissionController, the Gemini call holds
+        one of its slots until it returns, and AdmissionRejected propagates.
+        With a ConversationSession the prompt is a follow-up one, and the data
+        sent in full is noted on the session for ConversationService.record_turn.
+        """
+        location = prepared['location']
+        query_type = prepared['query_type']
+        rows = prepared['rows']
+        gemini_service = GeminiService()
+        
+        # Simple listing/stat questions are answered straight from the data
+        # (not from a sample: the listing and statistics would cover only the sampled rows)
+        local_intent = QueryClassifier.local_intent(user_query, query_type, prepared['mentions'])
+        if settings.LOCAL_FAST_PATH and local_intent and not prepared['approximate']:
+            return gemini_service.generate_local_summary(rows, location, user_query, local_intent), 'local'
+        
+        # Serve a pre-warmed summary when the question is the canonical one for this location and intent
+        summary = AnalysisService.prewarmed_summary(
+            user_query, location, prepared['locations'], query_type, prepared['dataset']
+        )
+        if summary is not None:
+            return summary, 'prewarmed'
+        
+        # INTELLIGENT SUMMARY GENERATION
+        key = prepared['context_key'] or gemini_service.context_key(
+            location, prepared['locations'], prepared['dataset']
+        )
+        context = prepared['context'] or gemini_service.cached_context(rows, location, key)
+        conversation = ConversationService.conversation(session, key) if session else None
+        token = admission.acquire() if admission else None
+        
+        def generate():
+            try:
+                return gemini_service.summarize(
+                    rows, location=location, query=user_query, query_type=query_type, context=context,
+                    conversation=conversation
+                )[0]
+            finally:
+                if admission:
+                    admission.release(token)
+        
+        try:
+            if deadline:
+                summary = _llm_executor.submit(generate).result(timeout=deadline)
+            else:
+                summary = generate()
+        except FuturesTimeoutError:
+            # The Gemini call keeps running (and holding its slot) in the background
+            print(f"Gemini missed the {deadline}s deadline, answering locally")
+            return gemini_service.generate_local_summary(rows, location, user_query, query_type), 'local_fallback'
+        except Exception as e:
+            print(f"Gemini Error: {str(e)}")
+            return gemini_service.generate_local_summary(rows, location, user_query, query_type), 'local_fallback'
+        if session and conversation['include_details']:
+            ConversationService.mark_sent(session, key)
+        return summary, 'llm'
+    
+    @staticmethod
+    def analyze_batch(queries, parallelism, dataset=None, admission=None, deadline=None):
+        """Analyze several queries against one snapshot of each location's data in `dataset`.
+        
+        Rows and the data context are fetched once per distinct location, and only
+        the LLM calls run concurrently (at most `parallelism` at a time). Results
+        come back in input order; a failing item carries an 'error' key instead.
+        With an AdmissionController each Gemini call holds one of its slots like
+        a single analyze does; a rejected item gets an 'error' and 'retryAfter'.
+        Items whose Gemini call has not returned `deadline` seconds into the
+        batch are answered locally.
+        """
+        items = []
+        for user_query in queries:
+            parsed = DataProcessingService.parse_query(user_query, dataset)
+            items.append({
+                'query': user_query,
+                'query_type': QueryClassifier.classify(user_query),
+                'location': parsed['location'],
+                'locations': parsed['locations'],
+                'mentions': parsed['mentions'],
+                'unmatched': parsed['unmatched'],
             })
-        return table_data
+        
+        gemini_service = GeminiService()
+        # 'Wakad' and 'Wakad vs Wakad Phase 2' select the same rows, but only the second is a comparison
+        snapshot_key = lambda item: (item['location'], item['mentions'] > 1)
+        snapshots = {}
+        for item in items:
+            location = item['location']
+            if snapshot_key(item) in snapshots:
+                continue
+            # Same data path as a single analyze, including the streaming pass above APPROX_STATS_MIN_ROWS
+            snapshot = AnalysisService.prepare(item['query'], dataset)
+            if snapshot['rows'] and snapshot['context'] is None:
+                key = snapshot['context_key'] or gemini_service.context_key(location, item['locations'], dataset)
+                snapshot['context'] = gemini_service.cached_context(snapshot['rows'], location, key)
+            snapshots[snapshot_key(item)] = snapshot
+        
+        results = [None] * len(items)
+        pending = []
+        for index, item in enumerate(items):
+            snapshot = snapshots[snapshot_key(item)]
+            if not snapshot['rows']:
+                results[index] = {
+                    'query': item['query'],
+                    'error': f'No properties found for {item["location"] if item["location"] else "the given criteria"}'
+                }
+                continue
+            local_intent = QueryClassifier.local_intent(item['query'], item['query_type'], item['mentions'])
+            if settings.LOCAL_FAST_PATH and local_intent and not snapshot['approximate']:
+                summary = gemini_service.generate_local_summary(
+                    snapshot['rows'], item['location'], item['query'], local_intent
+                )
+                results[index] = AnalysisService._batch_result(item, snapshot, summary, 'local')
+                continue
+            summary = AnalysisService.prewarmed_summary(
+                item['query'], item['location'], item['locations'], item['query_type'], dataset
+            )
+            if summary is not None:
+                results[index] = AnalysisService._batch_result(item, snapshot, summary, 'prewarmed')
+            else:
+                pending.append(index)
+        
+        # Set once the deadline passed: items still waiting for a slot were answered locally
+        abandoned = threading.Event()
+        
+        def generate(item, snapshot):
+            token = admission.acquire() if admission else None
+            try:
+                if abandoned.is_set():
+                    return None
+                return gemini_service.summarize(
+                    snapshot['rows'], item['location'], item['query'], item['query_type'], snapshot['context']
+                )[0]
+            finally:
+                if admission:
+                    admission.release(token)
+        
+        def local_fallback(index):
+            item = items[index]
+            snapshot = snapshots[snapshot_key(item)]
+            summary = gemini_service.generate_local_summary(
+                snapshot['rows'], item['location'], item['query'], item['query_type']
+            )
+            results[index] = AnalysisService._batch_result(item, snapshot, summary, 'local_fallback')
+        
+        # Worker threads only talk to Gemini; every DB access stays on this thread.
+        # No more workers than LLM slots, so the batch never fills the admission queue by itself
+        if admission:
+            parallelism = min(parallelism, admission.max_concurrent)
+        pool = ThreadPoolExecutor(max_workers=max(1, parallelism))
+        futures = {
+            pool.submit(generate, items[index], snapshots[snapshot_key(items[index])]): index
+            for index in pending
+        }
+        try:
+            # A deadline of 0 waits indefinitely, as in summarize()
+            for future in as_completed(futures, timeout=deadline or None):
+                index = futures[future]
+                item = items[index]
+                try:
+                    summary = future.result()
+                except AdmissionRejected as e:
+                    results[index] = {'query': item['query'], 'error': str(e), 'retryAfter': e.retry_after}
+                    continue
+                except Exception as e:
+                    print(f"Gemini Error: {str(e)}")
+                    local_fallback(index)
+                    continue
+                results[index] = AnalysisService._batch_result(item, snapshots[snapshot_key(item)], summary, 'llm')
+        except FuturesTimeoutError:
+            # Calls already talking to Gemini keep their slot until they return. Items not started
+            # yet are cancelled, and workers still waiting for a slot give it back unused
+            abandoned.set()
+            print(f"Batch missed the {deadline}s deadline, answering the remaining items locally")
+            for future, index in futures.items():
+                if results[index] is None:
+                    future.cancel()
+                    local_fallback(index)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        Query.objects.bulk_create([
+            Query(
+                user_query=item['query'],
+                location_filter=item['location'] or 'all',
+                response_summary=result['summary'],
+                chart_data=result['chartData'],
+                table_data=result['tableData']
+            )
+            for item, result in zip(items, results) if 'error' not in result
+        ])
+        return results
+    
+    @staticmethod
+    def _batch_result(item, snapshot, summary, summary_source):
+        return {
+            'query': item['query'],
+            'summary': summary,
+            'chartData': snapshot['chart_data'],
+            'tableData': snapshot['table_data'],
+            'count': snapshot['count'],
+            'queryType': item['query_type'],
+            'summarySource': summary_source,
+            **({'comparison': snapshot['comparison']} if snapshot['comparison'] else {}),
+            **({'approximate': snapshot['approximate']} if snapshot['approximate'] else {}),
+            **({'unmatchedLocations': item['unmatched']} if item['unmatched'] else {}),
+        }
+    
+    @staticmethod
+    def run_job(job):
+        """Process a claimed AnalysisJob, saving chart/table data before the summary"""
+        prepared = AnalysisService.prepare(job.user_query, job.dataset or None)
+        location = prepared['location']
+        job.query_type = prepared['query_type']
+        job.location_filter = location or 'all'
+        
+        if prepared['table_data'] is None:
+            job.status = AnalysisJob.STATUS_FAILED
+            job.error = f'No properties found for {location if location else "the given criteria"}'
+            job.finished_at = timezone.now()
+            job.save(update_fields=['query_type', 'location_filter', 'status', 'error', 'finished_at'])
+            return job
+        
+        # Make chart/table data pollable while the summary is still generating
+        job.chart_data = prepared['chart_data']
+        job.table_data = prepared['table_data']
+        job.row_count = prepared['count']
+        job.save(update_fields=['query_type', 'location_filter', 'chart_data', 'table_data', 'row_count'])
+        
+        summary, summary_source = AnalysisService.summarize(job.user_query, prepared)
+        
+        Query.objects.create(
+            user_query=job.user_query,
+            location_filter=job.location_filter,
+            response_summary=summary,
+            chart_data=job.chart_data,
+            table_data=job.table_data
+        )
+        
+        job.summary = summary
+        job.summary_source = summary_source
+        job.status = AnalysisJob.STATUS_COMPLETED
+        job.finished_at = timezone.now()
+        job.save(update_fields=['summary', 'summary_source', 'status', 'finished_at'])
+        return job
+
+
+class ConversationService:
+    """Server-side conversation sessions for follow-up questions.
+    
+    Gemini calls are stateless, so a follow-up still sends the earlier turns,
+    but only as compact history: the property listings of a location go out
+    once per session and data version, later turns get the aggregate digest.
+    """
+    
+    @staticmethod
+    def resolve(session_id):
+        """Return the live session with this id, or a new one when it is None, unknown or expired"""
+        now = timezone.now()
+        if session_id is not None:
+            session = ConversationSession.objects.filter(id=session_id, expires_at__gt=now).first()
+            if session is not None:
+                return session
+        # Creating sessions is rare enough to sweep the expired ones here
+        ConversationSession.objects.filter(expires_at__lte=now).delete()
+        return ConversationSession(expires_at=now + timedelta(seconds=settings.SESSION_TTL_SECONDS))
+    
+    @staticmethod
+    def _sent_key(key):
+        location, version = key
+        return [location, str(version)]
+    
+    @staticmethod
+    def conversation(session, key):
+        """Prompt inputs for GeminiService.summarize(conversation=...)"""
+        return {
+            'history': session.history,
+            'include_details': ConversationService._sent_key(key) not in session.sent_contexts,
+        }
+    
+    @staticmethod
+    def mark_sent(session, key):
+        """Note that the full data for `key` reached the model in this session"""
+        sent_key = ConversationService._sent_key(key)
+        # A location's previous version is superseded, not kept alongside
+        sent = [entry for entry in session.sent_contexts if entry[0] != sent_key[0]]
+        session.sent_contexts = (sent + [sent_key])[-settings.SESSION_MAX_TURNS:]
+    
+    @staticmethod
+    def previous_locations(session, dataset=None):
+        """(location, locations, mentions) of the session's last turn in `dataset`, or None without one"""
+        if not session.history:
+            return None
+        turn = session.history[-1]
+        if (turn.get('dataset') or settings.DEFAULT_DATASET) != (dataset or settings.DEFAULT_DATASET):
+            return None
+        locations = turn.get('locations', [])
+        return turn['location'], locations, turn.get('mentions', len(locations))
+    
+    @staticmethod
+    def record_turn(session, user_query, prepared, summary):
+        """Append a turn, trim the history and extend the session's expiry"""
+        session.history = (session.history + [{
+            'query': user_query,
+            'answer': summary[:settings.SESSION_ANSWER_CHARS],
+            'location': prepared['location'],
+            'locations': prepared['locations'],
+            'mentions': prepared['mentions'],
+            'dataset': prepared['dataset'],
+            'queryType': prepared['query_type'],
+        }])[-settings.SESSION_MAX_TURNS:]
+        session.expires_at = timezone.now() + timedelta(seconds=settings.SESSION_TTL_SECONDS)
+        session.save()
+        return session
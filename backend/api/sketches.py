@@ -0,0 +1,217 @@
+"""Mergeable streaming summaries for result sets too large to hold in memory.
+
+Each one is fed values one at a time, uses bounded memory, and can be merged
+with another built over a different part of the data (e.g. another chunk or
+worker), giving the same guarantees as one built over both parts.
+
+Error bounds:
+
+- RunningStats (Welford): count, min and max are exact; mean and variance
+  match the two-pass results up to floating-point rounding.
+- KLLSketch (Karnin-Lang-Liberty): a quantile query returns a value whose true
+  rank is within about 1.65% of the requested one (eps * n) with 99%
+  probability at k=200; the error scales as 1/k. Memory is O(k) values
+  whatever the stream length. Up to k values nothing is compacted and answers
+  are exact order statistics (the lower median for an even count); compaction
+  starts at value k+1, after which only the rank bound above holds.
+- Reservoir: a uniform random sample without replacement, so every row has
+  the same size/n chance of being kept. Nothing outside the sample is seen.
+"""
+import math
+import random
+
+
+class RunningStats:
+    """Count, mean, variance, min and max in one pass (Welford's algorithm)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Combine with another RunningStats (Chan et al.'s parallel update)"""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self._m2, self.min, self.max = (
+                other.count, other.mean, other._m2, other.min, other.max
+            )
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def total(self):
+        return self.mean * self.count
+
+    @property
+    def variance(self):
+        """Sample variance, like statistics.variance()"""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class KLLSketch:
+    """Quantile sketch with a hierarchy of compactors (Karnin, Lang and Liberty, 2016).
+
+    Values at level h stand for 2**h inputs. When the sketch is full, the
+    lowest full level is sorted and every other value (random offset) moves up
+    a level, which keeps ranks unbiased. Capacities shrink by `c` per level
+    below the top, so total memory stays around k / (1 - c).
+    """
+
+    def __init__(self, k=200, c=2 / 3, seed=None):
+        self.k = k
+        self.c = c
+        self.count = 0
+        self._random = random.Random(seed)
+        self._levels = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _grow(self):
+        self._levels.append([])
+        self._max_size = sum(self._capacity(level) for level in range(len(self._levels)))
+
+    def add(self, value):
+        self._levels[0].append(value)
+        self._size += 1
+        self.count += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        for level in range(len(self._levels)):
+            if len(self._levels[level]) >= self._capacity(level):
+                if level + 1 >= len(self._levels):
+                    self._grow()
+                values = sorted(self._levels[level])
+                # With an odd count the smallest value stays behind
+                keep = len(values) % 2
+                offset = self._random.random() < 0.5
+                self._levels[level + 1].extend(values[keep + offset::2])
+                self._levels[level] = values[:keep]
+                self._size = sum(len(values) for values in self._levels)
+                if self._size < self._max_size:
+                    break
+
+    def merge(self, other):
+        """Fold another sketch (of any size) into this one"""
+        while len(self._levels) < len(other._levels):
+            self._grow()
+        for level, values in enumerate(other._levels):
+            self._levels[level].extend(values)
+        self.count += other.count
+        self._size = sum(len(values) for values in self._levels)
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    def _weighted(self):
+        weighted = [(value, 1 << level) for level, values in enumerate(self._levels) for value in values]
+        weighted.sort(key=lambda item: item[0])
+        return weighted
+
+    def quantile(self, fraction):
+        """Value at rank `fraction` (0..1) of the stream, or None when empty"""
+        weighted = self._weighted()
+        if not weighted:
+            return None
+        target = fraction * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def rank(self, value):
+        """Estimated fraction of the stream that is <= value"""
+        weighted = self._weighted()
+        total = sum(weight for _, weight in weighted)
+        if not total:
+            return 0.0
+        return sum(weight for item, weight in weighted if item <= value) / total
+
+
+class Reservoir:
+    """Uniform random sample of up to `size` items from a stream.
+
+    Uses Li's Algorithm L: instead of a random draw per item it jumps straight
+    to the next item that enters the sample, so only O(size * log(n / size))
+    random numbers are drawn for n items.
+    """
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.items = []
+        self.seen = 0
+        self._random = random.Random(seed)
+        self._weight = 1.0
+        self._next = None  # 1-based position of the next item to keep
+
+    def _skip(self, weight=None):
+        """Choose the next item to keep; `weight` resets the running threshold (after a merge)"""
+        if weight is None:
+            weight = self._weight * math.exp(math.log(1.0 - self._random.random()) / self.size)
+        self._weight = weight
+        gap = math.floor(math.log(1.0 - self._random.random()) / math.log(1.0 - self._weight)) if self._weight < 1 else 0
+        self._next = self.seen + gap + 1
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            if len(self.items) == self.size:
+                self._skip()
+        elif self.seen == self._next:
+            self.items[self._random.randrange(self.size)] = item
+            self._skip()
+
+    def merge(self, other):
+        """Sample of both streams, each side drawn in proportion to how many items it saw"""
+        mine = self._random.sample(self.items, len(self.items))
+        theirs = self._random.sample(other.items, len(other.items))
+        # Draw without replacement from the union of both streams: the side
+        # an item comes from follows the hypergeometric split of seen counts
+        mine_left, theirs_left = self.seen, other.seen
+        merged = []
+        while len(merged) < self.size and (mine or theirs):
+            if theirs and (not mine or self._random.random() * (mine_left + theirs_left) >= mine_left):
+                merged.append(theirs.pop())
+                theirs_left -= 1
+            else:
+                merged.append(mine.pop())
+                mine_left -= 1
+        self.items = merged
+        self.seen += other.seen
+        if len(self.items) == self.size:
+            # The k-th smallest of `seen` uniform keys is about size / seen
+            self._skip(weight=self.size / self.seen)
+        return self
@@ -0,0 +1,75 @@
+"""Record every SQL statement a block of code runs.
+
+Used by the profiling middleware and by `manage.py check_query_budgets`:
+
+    with record_queries() as recorder:
+        client.get('/api/properties/')
+    recorder.count, recorder.duplicates(), recorder.repeated_statements()
+
+Django's SQL keeps parameters out of the statement text, so two executions
+of the same text with different parameters are the same query shape. The
+same shape running many times in one request is the usual N+1 signature
+(a query per row of an earlier result), and the same shape with identical
+parameters is a query whose result could have been reused.
+"""
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class SQLRecorder:
+    """connection.execute_wrapper() hook collecting (sql, milliseconds)"""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.queries = []
+        self.count = 0
+        self.total = 0.0
+        self._shapes = Counter()
+        self._exact = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.total += elapsed
+            self._shapes[sql] += 1
+            if not many:
+                self._exact[(sql, _hashable(params))] += 1
+            if self.limit is None or len(self.queries) < self.limit:
+                self.queries.append({'sql': sql, 'ms': round(elapsed * 1000, 3), 'many': many})
+
+    @property
+    def total_ms(self):
+        return self.total * 1000
+
+    def duplicates(self):
+        """[(sql, times)] for statements run more than once with identical parameters"""
+        return [(sql, times) for (sql, _), times in self._exact.most_common() if times > 1]
+
+    def repeated_statements(self, threshold=3):
+        """[(sql, times)] for statement shapes run at least `threshold` times (likely N+1)"""
+        return [(sql, times) for sql, times in self._shapes.most_common() if times >= threshold]
+
+
+def _hashable(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return tuple(sorted((key, repr(value)) for key, value in params.items()))
+    return tuple(repr(value) for value in params)
+
+
+@contextmanager
+def record_queries(limit=None):
+    """Record the queries run on every configured database inside the block"""
+    recorder = SQLRecorder(limit)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
@@ -0,0 +1,163 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+
+from .context_cache import data_context_cache
+from .management.commands.check_query_budgets import BUDGETS, Command as CheckQueryBudgets
+from .models import Dataset, Property, Query
+from .services import DataProcessingService
+
+
+def make_properties(counts):
+    """Unsaved properties, counts[location] rows per location"""
+    return [
+        Property(
+            location=location, property_type='residential', price=5000 + index, price_per_sqft=100,
+            area_sqft=50, year=2018 + index % 7, demand=index % 50, demand_score=float(index % 400),
+        )
+        for location, count in counts.items() for index in range(count)
+    ]
+
+
+@override_settings(RELOAD_BATCH_ROWS=500)
+class ReloadConcurrencyTests(TransactionTestCase):
+    """A reload must neither show readers a partial dataset nor lock writers out"""
+
+    OLD = {'Baner': 1000, 'Wakad': 3000}
+    NEW = {'Aundh': 500, 'Baner': 2500, 'Wakad': 2000}
+
+    def setUp(self):
+        cache.clear()
+        DataProcessingService.replace_properties(make_properties(self.OLD))
+
+    @staticmethod
+    def location_counts():
+        # One statement, so it sees a single version of the dataset
+        queryset = DataProcessingService.filter_properties().order_by().values_list('location')
+        return dict(queryset.annotate(count=Count('id')))
+
+    def test_reload_under_concurrent_reads_and_writes(self):
+        stop = threading.Event()
+        seen, writes, errors = [], [], []
+
+        def run(step):
+            try:
+                while not stop.is_set():
+                    step()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        def read():
+            seen.append(self.location_counts())
+
+        def write():
+            Query.objects.create(
+                user_query='During a reload', location_filter='all', response_summary='', chart_data={}, table_data=[]
+            )
+            writes.append(time.monotonic())
+            time.sleep(0.01)
+
+        threads = [threading.Thread(target=run, args=(step,)) for step in (read, read, write, write)]
+        for thread in threads:
+            thread.start()
+        try:
+            time.sleep(0.2)
+            started = time.monotonic()
+            DataProcessingService.replace_properties(make_properties(self.NEW))
+            finished = time.monotonic()
+            time.sleep(0.2)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(all(counts in (self.OLD, self.NEW) for counts in seen))
+        self.assertIn(self.OLD, seen)
+        self.assertIn(self.NEW, seen)
+        self.assertTrue(any(started < written < finished for written in writes))
+        # The old version is gone once the reload returns
+        self.assertEqual(Property.objects.count(), sum(self.NEW.values()))
+        self.assertEqual(Dataset.objects.get().row_count, sum(self.NEW.values()))
+
+    def test_failed_reload_keeps_old_rows(self):
+        properties = make_properties(self.NEW)
+        properties[-1].price = None
+        with self.assertRaises(Exception):
+            DataProcessingService.replace_properties(properties)
+
+        self.assertEqual(self.location_counts(), self.OLD)
+        self.assertEqual(Property.objects.count(), sum(self.OLD.values()))
+
+
+@override_settings(LLM_BACKEND='stub', LLM_STUB_LATENCY_MS=0, LLM_STUB_ERROR_RATE=0, APPROX_STATS_MIN_ROWS=0)
+class QueryBudgetTests(TestCase):
+    """The per-endpoint budgets of `manage.py check_query_budgets`, checked on fixture data"""
+
+    @classmethod
+    def setUpTestData(cls):
+        DataProcessingService.replace_properties(make_properties({'Aundh': 40, 'Baner': 60, 'Wakad': 80}))
+
+    def test_endpoints_within_query_budgets(self):
+        # Like a worker after warm-up (and check_query_budgets): dataset ids and the
+        # location index are cached, everything else starts cold
+        cache.clear()
+        data_context_cache.clear()
+        DataProcessingService.location_index(refresh=True)
+        client = Client(SERVER_NAME='localhost')
+        names = {'location': 'Baner', 'other': 'Wakad'}
+        options = {'max_sql_ms': settings.QUERY_BUDGET_MAX_SQL_MS, 'repeated_threshold': 3}
+        for name, method, path, body, budget in BUDGETS:
+            # Cold caches on the first call, warm on the second
+            for attempt in ('cold', 'warm'):
+                with self.subTest(endpoint=name, caches=attempt):
+                    status, recorder = CheckQueryBudgets._call(client, method, path.format(**names), body, names)
+                    self.assertEqual(CheckQueryBudgets._problems(recorder, status, budget, options), [])
+
+
+@override_settings(LLM_BACKEND='stub', LLM_STUB_LATENCY_MS=0, LLM_STUB_ERROR_RATE=0, LOCAL_FAST_PATH=True)
+class LocationMentionTests(TestCase):
+    """A place named once is one place, however many loaded locations contain its name"""
+
+    @classmethod
+    def setUpTestData(cls):
+        DataProcessingService.replace_properties(make_properties({'Baner': 30, 'Wakad': 20, 'Wakad Phase 2': 10}))
+
+    def setUp(self):
+        cache.clear()
+        data_context_cache.clear()
+        self.client = Client(SERVER_NAME='localhost')
+
+    def analyze(self, query):
+        response = self.client.post('/api/queries/analyze/', {'query': query}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_one_place_is_answered_locally_without_comparison(self):
+        result = self.analyze('What is the average price in Wakad?')
+        self.assertEqual(result['summarySource'], 'local')
+        self.assertNotIn('comparison', result)
+        self.assertEqual(result['count'], 30)
+
+    def test_several_places_are_compared(self):
+        result = self.analyze('What is the average price in Wakad and Baner?')
+        self.assertEqual(result['summarySource'], 'llm')
+        self.assertEqual({entry['location'] for entry in result['comparison']}, {'Baner', 'Wakad', 'Wakad Phase 2'})
+
+    def test_batch_keeps_comparison_per_query(self):
+        queries = ['What is the average price in Wakad?', 'Wakad or Wakad Phase 2, what is the average price?']
+        response = self.client.post(
+            '/api/queries/analyze_batch/', {'queries': queries}, content_type='application/json'
+        )
+        single, both = response.json()['results']
+        self.assertEqual(single['summarySource'], 'local')
+        self.assertNotIn('comparison', single)
+        self.assertEqual(both['summarySource'], 'llm')
+        self.assertEqual({entry['location'] for entry in both['comparison']}, {'Wakad', 'Wakad Phase 2'})
@@ -0,0 +1,99 @@
+"""Per-location time series with server-side downsampling.
+
+Rows are aggregated with numpy (no per-row Python loops) and each series is
+capped with Largest-Triangle-Three-Buckets, which keeps the visual shape of a
+line (peaks, dips) far better than taking every n-th point.
+"""
+import numpy as np
+from django.db.models import Q
+
+from .services import DataProcessingService
+
+METRICS = ('price', 'price_per_sqft', 'demand_score')
+GRANULARITIES = ('year', 'raw')
+
+
+def lttb(x, y, threshold):
+    """Return the indexes of the points LTTB keeps when reducing (x, y) to `threshold` points.
+
+    x must be sorted. The first and last points are always kept.
+    """
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])[:max(threshold, 1)]
+
+    # Interior points are split into threshold - 2 equal buckets
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Twice the triangle area formed with the previous pick and the next bucket's average
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[bucket + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def _yearly_means(years, values):
+    unique_years, inverse = np.unique(years, return_inverse=True)
+    sums = np.bincount(inverse, weights=values)
+    counts = np.bincount(inverse)
+    return unique_years.astype(float), sums / counts
+
+
+def build_series(locations, metric, max_points, granularity='year', dataset=None):
+    """Return one series per requested location of `dataset` (None for DEFAULT_DATASET).
+
+    Locations match like filter_properties (case-insensitive substring).
+    granularity='year' averages each year; 'raw' keeps every property as a point.
+    """
+    matches_any = Q()
+    for location in locations:
+        matches_any |= Q(location__icontains=location)
+    rows = list(
+        DataProcessingService.filter_properties(dataset=dataset).filter(matches_any, **{f'{metric}__isnull': False})
+        .order_by().values_list('location', 'year', metric)
+    )
+    if rows:
+        location_names, years, values = zip(*rows)
+        lowered = np.char.lower(np.asarray(location_names, dtype=str))
+        years = np.asarray(years, dtype=float)
+        values = np.asarray(values, dtype=float)
+    else:
+        lowered, years, values = np.asarray([], dtype=str), np.zeros(0), np.zeros(0)
+
+    series = []
+    for location in locations:
+        mask = np.char.find(lowered, location.lower()) >= 0
+        x, y = years[mask], values[mask]
+        raw_count = int(mask.sum())
+
+        if granularity == 'year':
+            x, y = _yearly_means(x, y) if raw_count else (x, y)
+        else:
+            order = np.argsort(x, kind='stable')
+            x, y = x[order], y[order]
+
+        keep = lttb(x, y, max_points)
+        series.append({
+            'location': location,
+            'metric': metric,
+            'rawCount': raw_count,
+            'points': [
+                {'year': int(year), 'value': round(float(value), 2)}
+                for year, value in zip(x[keep], y[keep])
+            ],
+        })
+    return series
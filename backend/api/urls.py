@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PropertyViewSet, QueryViewSet
+from .views import PropertyViewSet, QueryViewSet, AnalysisJobViewSet
 
 router = DefaultRouter()
 router.register(r'properties', PropertyViewSet, basename='property')
 router.register(r'queries', QueryViewSet, basename='query')
+router.register(r'jobs', AnalysisJobViewSet, basename='job')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -2,35 +2,127 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.http import HttpResponse
-from .models import Property, Query
-from .serializers import PropertySerializer, QuerySerializer, QueryRequestSerializer
-from .services import GeminiService, DataProcessingService, QueryClassifier
+from django.core.exceptions import ValidationError
+from django.conf import settings
+from .models import Dataset, Query, AnalysisJob
+from .serializers import (
+    DatasetQuerySerializer, PropertySerializer, QuerySerializer, QueryRequestSerializer, BatchQueryRequestSerializer
+)
+from .services import DataProcessingService, AnalysisService, ConversationService, PROPERTY_ROW_FIELDS
+from . import ranking, search
+from .admission import llm_admission, AdmissionRejected
+from .context_cache import data_context_cache
+from .renderers import COMPACT_RENDERER_CLASSES
 import csv
+import itertools
 import json
 
 
 class PropertyViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Property.objects.all()
     serializer_class = PropertySerializer
+    renderer_classes = COMPACT_RENDERER_CLASSES
+    row_fields = PROPERTY_ROW_FIELDS + ('created_at',)
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # ?dataset=<name> selects a dataset (DEFAULT_DATASET otherwise); an unknown one is a 400, as in analyze
+        serializer = DatasetQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        self.dataset = serializer.validated_data.get('dataset')
+    
+    def get_queryset(self):
+        return DataProcessingService.filter_properties(dataset=self.dataset)
+    
+    def _serialize_rows(self, queryset, fields=None):
+        """Serialize plain float rows instead of model instances (no Decimal per field)"""
+        fields = fields or self.row_fields
+        rows = [dict(zip(fields, row)) for row in DataProcessingService.float_values_list(queryset, fields)]
+        return rows, self.get_serializer(rows, many=True).data
+    
+    def list(self, request, *args, **kwargs):
+        queryset = DataProcessingService.float_values_list(self.filter_queryset(self.get_queryset()), self.row_fields)
+        page = self.paginate_queryset(queryset)
+        rows = [dict(zip(self.row_fields, row)) for row in (queryset if page is None else page)]
+        serializer = self.get_serializer(rows, many=True)
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def by_location(self, request):
         location = request.query_params.get('location')
         if location:
-            queryset = self.queryset.filter(location__icontains=location)
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
+            _, data = self._serialize_rows(self.get_queryset().filter(location__icontains=location))
+            return Response(data)
         return Response({'error': 'Location parameter required'}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
     def locations_list(self, request):
-        locations = self.queryset.values_list('location', flat=True).distinct()
-        return Response({'locations': list(locations)})
+        return Response({'locations': DataProcessingService.location_index(dataset=self.dataset)})
+    
+    @action(detail=False, methods=['get'])
+    def datasets(self, request):
+        datasets = [
+            {'name': name, 'source': source, 'rows': rows, 'updatedAt': updated_at}
+            for name, source, rows, updated_at in Dataset.objects.values_list('name', 'source', 'row_count', 'updated_at')
+        ]
+        return Response({'default': settings.DEFAULT_DATASET, 'datasets': datasets})
+    
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        from . import timeseries  # numpy is only loaded once this endpoint is used
+        
+        locations = [loc.strip() for loc in request.query_params.get('locations', '').split(',') if loc.strip()]
+        if not locations:
+            return Response({'error': 'locations parameter required (comma-separated)'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(locations) > settings.TIMESERIES_MAX_LOCATIONS:
+            return Response({'error': f'At most {settings.TIMESERIES_MAX_LOCATIONS} locations per request'}, status=status.HTTP_400_BAD_REQUEST)
+        metric = request.query_params.get('metric', 'price')
+        if metric not in timeseries.METRICS:
+            return Response({'error': f'metric must be one of: {", ".join(timeseries.METRICS)}'}, status=status.HTTP_400_BAD_REQUEST)
+        granularity = request.query_params.get('granularity', 'year')
+        if granularity not in timeseries.GRANULARITIES:
+            return Response({'error': f'granularity must be one of: {", ".join(timeseries.GRANULARITIES)}'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            max_points = int(request.query_params.get('max_points', settings.TIMESERIES_MAX_POINTS))
+        except ValueError:
+            return Response({'error': 'max_points must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        max_points = max(3, min(max_points, settings.TIMESERIES_MAX_POINTS))
+        
+        series = timeseries.build_series(
+            locations, metric, max_points, granularity, dataset=self.dataset
+        )
+        return Response({'metric': metric, 'granularity': granularity, 'maxPoints': max_points, 'series': series})
+    
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        metric = request.query_params.get('metric', 'roi')
+        if metric not in ranking.METRICS:
+            return Response({
+                'error': f'metric must be one of: {", ".join(ranking.METRICS)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            k = int(request.query_params.get('k', 5))
+        except ValueError:
+            return Response({'error': 'k must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= k <= settings.TOP_K_MAX:
+            return Response({'error': f'k must be between 1 and {settings.TOP_K_MAX}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        location = request.query_params.get('location')
+        queryset = DataProcessingService.filter_properties(location=location, dataset=self.dataset)
+        top_properties = ranking.top_k_queryset(queryset, metric, k)
+        
+        rows, serialized = self._serialize_rows(top_properties, self.row_fields + ('score',))
+        results = []
+        for row, data in zip(rows, serialized):
+            data['score'] = row['score']
+            results.append(data)
+        return Response({'metric': metric, 'k': k, 'location': location, 'results': results})
 
 
 class QueryViewSet(viewsets.ViewSet):
     
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], renderer_classes=COMPACT_RENDERER_CLASSES)
     def analyze(self, request):
         serializer = QueryRequestSerializer(data=request.data)
         if not serializer.is_valid():
@@ -38,34 +130,30 @@ class QueryViewSet(viewsets.ViewSet):
         
         user_query = serializer.validated_data['query']
         
-        # INTELLIGENT QUERY CLASSIFICATION
-        query_type = QueryClassifier.classify(user_query)
+        # Stateless unless the client opts in by sending sessionId (null to start one)
+        session = None
+        if 'sessionId' in serializer.validated_data:
+            session = ConversationService.resolve(serializer.validated_data['sessionId'])
         
-        # Parse location from query
-        parsed = DataProcessingService.parse_query(user_query)
-        location = parsed['location']
-        
-        # Filter properties
-        properties = DataProcessingService.filter_properties(location=location)
+        prepared = AnalysisService.prepare(user_query, serializer.validated_data.get('dataset'), session)
+        location = prepared['location']
         
-        if not properties.exists():
+        if prepared['table_data'] is None:
             return Response({
                 'error': f'No properties found for {location if location else "the given criteria"}'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Prepare chart and table data
-        chart_data = DataProcessingService.prepare_chart_data(properties)
-        table_data = DataProcessingService.prepare_table_data(properties)
-        
-        # INTELLIGENT SUMMARY GENERATION
-        gemini_service = GeminiService()
-        properties_list = list(properties.values())
-        summary = gemini_service.generate_intelligent_summary(
-            properties_list, 
-            location=location, 
-            query=user_query,
-            query_type=query_type
-        )
+        chart_data = prepared['chart_data']
+        table_data = prepared['table_data']
+        try:
+            summary, summary_source = AnalysisService.summarize(
+                user_query, prepared, admission=llm_admission, deadline=settings.LLM_DEADLINE_SECONDS,
+                session=session
+            )
+        except AdmissionRejected as e:
+            return Response({
+                'error': f'{e}, please retry shortly'
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(e.retry_after)})
         
         # Save query to database
         query_obj = Query.objects.create(
@@ -76,20 +164,91 @@ class QueryViewSet(viewsets.ViewSet):
             table_data=table_data
         )
         
-        return Response({
+        data = {
             'summary': summary,
             'chartData': chart_data,
             'tableData': table_data,
-            'count': len(table_data),
-            'queryType': query_type
+            'count': prepared['count'],
+            'queryType': prepared['query_type'],
+            'summarySource': summary_source
+        }
+        if prepared['comparison']:
+            data['comparison'] = prepared['comparison']
+        if prepared['unmatched']:
+            # Named cities with no data, e.g. Mumbai in "Compare Wakad vs Mumbai"
+            data['unmatchedLocations'] = prepared['unmatched']
+        if prepared['approximate']:
+            data['approximate'] = prepared['approximate']
+        if session is not None:
+            ConversationService.record_turn(session, user_query, prepared, summary)
+            data['sessionId'] = str(session.id)
+        return Response(data)
+    
+    @action(detail=False, methods=['post'], renderer_classes=COMPACT_RENDERER_CLASSES)
+    def analyze_batch(self, request):
+        serializer = BatchQueryRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        parallelism = serializer.validated_data.get('parallelism', settings.ANALYZE_BATCH_PARALLELISM)
+        results = AnalysisService.analyze_batch(
+            serializer.validated_data['queries'], parallelism, serializer.validated_data.get('dataset'),
+            admission=llm_admission, deadline=settings.LLM_DEADLINE_SECONDS
+        )
+        
+        return Response({
+            'results': results,
+            'count': len(results),
+            'errors': sum(1 for result in results if 'error' in result)
         })
     
+    @action(detail=False, methods=['post'])
+    def analyze_async(self, request):
+        serializer = QueryRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        # The work itself is picked up by `manage.py run_analysis_worker`
+        job = AnalysisJob.objects.create(
+            user_query=serializer.validated_data['query'],
+            dataset=serializer.validated_data.get('dataset', '')
+        )
+        
+        return Response({
+            'jobId': str(job.id),
+            'status': job.status,
+            'statusUrl': request.build_absolute_uri(f'/api/jobs/{job.id}/')
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'])
+    def llm_metrics(self, request):
+        # Per worker process: each gunicorn worker has its own limiter and context cache
+        metrics = llm_admission.snapshot()
+        metrics['contextCache'] = data_context_cache.snapshot()
+        return Response(metrics)
+    
     @action(detail=False, methods=['get'])
     def history(self, request):
         queries = Query.objects.all()[:10]
         serializer = QuerySerializer(queries, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'q parameter required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limit <= settings.QUERY_SEARCH_MAX_RESULTS:
+            return Response({
+                'error': f'limit must be between 1 and {settings.QUERY_SEARCH_MAX_RESULTS}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'query': text, 'results': search.search_queries(text, limit)})
+    
     @action(detail=False, methods=['post'])
     def download_data(self, request):
         serializer = QueryRequestSerializer(data=request.data)
@@ -97,33 +256,70 @@ class QueryViewSet(viewsets.ViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         user_query = serializer.validated_data['query']
-        parsed = DataProcessingService.parse_query(user_query)
+        dataset = serializer.validated_data.get('dataset')
+        parsed = DataProcessingService.parse_query(user_query, dataset)
         location = parsed['location']
         
-        properties = DataProcessingService.filter_properties(location=location)
-        
-        if not properties.exists():
+        # One query: rows stream straight into the CSV, and an empty result means 404
+        rows = DataProcessingService.filter_properties(
+            location=location, locations=parsed['locations'], dataset=dataset
+        ).values_list(
+            'location', 'property_type', 'price', 'price_per_sqft', 'area_sqft', 'year', 'demand', 'demand_score'
+        ).iterator(chunk_size=2000)
+        first = next(rows, None)
+        if first is None:
             return Response({
                 'error': 'No properties found for download'
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Create CSV response
         response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="real_estate_{location or "data"}.csv"'
+        name = '_'.join(parsed['locations']) or location or 'data'
+        response['Content-Disposition'] = f'attachment; filename="real_estate_{name}.csv"'
         
         writer = csv.writer(response)
         writer.writerow(['Location', 'Type', 'Price', 'Price/Sqft', 'Area (Sqft)', 'Year', 'Demand', 'Demand Score'])
         
-        for prop in properties:
+        for prop_location, property_type, price, price_per_sqft, area_sqft, year, demand, demand_score in itertools.chain([first], rows):
             writer.writerow([
-                prop.location,
-                prop.property_type,
-                prop.price,
-                prop.price_per_sqft or '',
-                prop.area_sqft or '',
-                prop.year,
-                prop.demand,
-                prop.demand_score
+                prop_location,
+                property_type,
+                price,
+                price_per_sqft or '',
+                area_sqft or '',
+                year,
+                demand,
+                demand_score
             ])
         
         return response
+
+
+class AnalysisJobViewSet(viewsets.ViewSet):
+    renderer_classes = COMPACT_RENDERER_CLASSES
+    
+    def retrieve(self, request, pk=None):
+        try:
+            job = AnalysisJob.objects.get(pk=pk)
+        except (AnalysisJob.DoesNotExist, ValidationError):
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        data = {
+            'jobId': str(job.id),
+            'status': job.status,
+            'query': job.user_query,
+            'queryType': job.query_type or None,
+            'createdAt': job.created_at,
+            'finishedAt': job.finished_at,
+        }
+        # Chart/table data is available before the summary is
+        if job.table_data is not None:
+            data['chartData'] = job.chart_data
+            data['tableData'] = job.table_data
+            data['count'] = job.row_count if job.row_count is not None else len(job.table_data)
+        if job.status == AnalysisJob.STATUS_COMPLETED:
+            data['summary'] = job.summary
+            data['summarySource'] = job.summary_source
+        if job.status == AnalysisJob.STATUS_FAILED:
+            data['error'] = job.error
+        return Response(data)
@@ -0,0 +1,51 @@
+"""Pre-build per-process state so the first request doesn't pay for it.
+
+Used by `manage.py warmup` and the gunicorn `post_worker_init` hook. A failing
+step (e.g. an unmigrated database) is logged and skipped so the worker still boots.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Run every warm-up step; returns [(step, seconds, error or None), ...]"""
+    from .services import DataProcessingService, get_gemini_model
+
+    steps = [
+        ('location index', lambda: DataProcessingService.location_index(refresh=True)),
+    ]
+    if settings.LLM_BACKEND != 'stub':
+        steps.append(('llm client', get_gemini_model))
+    if settings.USE_SHARED_DATASET:
+        steps.append(('shared dataset', _warm_shared_dataset))
+
+    timings = []
+    for name, step in steps:
+        started = time.perf_counter()
+        error = None
+        try:
+            step()
+        except Exception as e:
+            logger.exception("Warm-up step %r failed", name)
+            error = str(e)
+        timings.append((name, time.perf_counter() - started, error))
+
+    # Django connections are per thread and gthread requests run on other threads,
+    # so the connection the steps opened here would only sit idle
+    connection.close()
+    return timings
+
+
+def _warm_shared_dataset():
+    from .dataset_file import get_shared_dataset
+
+    dataset = get_shared_dataset()
+    if dataset is not None:
+        # Touch every column so its pages are resident before the first query
+        for column in dataset.columns.values():
+            column.sum()
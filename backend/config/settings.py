@@ -31,6 +31,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,6 +64,8 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
         'PORT': os.getenv('DB_PORT', '5432'),
+        # A file rather than SQLite's in-memory test database: the reload tests need WAL and several threads
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3' if not os.getenv('DATABASE_URL') else None},
     }
 }
 
@@ -85,10 +88,122 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 100
+    'PAGE_SIZE': 100,
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:5173').split(',')
 CORS_ALLOW_CREDENTIALS = True
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
+# USD per million tokens, used to report generation cost
+GEMINI_INPUT_COST_PER_MILLION = float(os.getenv('GEMINI_INPUT_COST_PER_MILLION', '0.30'))
+GEMINI_OUTPUT_COST_PER_MILLION = float(os.getenv('GEMINI_OUTPUT_COST_PER_MILLION', '2.50'))
+
+# Summary pre-warming (see `manage.py prewarm_summaries`)
+PREWARM_CONCURRENCY = int(os.getenv('PREWARM_CONCURRENCY', '4'))
+SERVE_PREWARMED_SUMMARIES = os.getenv('SERVE_PREWARMED_SUMMARIES', 'True') == 'True'
+# A pre-warmed summary only answers questions this close (0-1, word-level) to its canonical question
+PREWARM_MATCH_RATIO = float(os.getenv('PREWARM_MATCH_RATIO', '0.85'))
+
+# Background analyze jobs (see `manage.py run_analysis_worker`)
+ANALYSIS_JOB_WORKERS = int(os.getenv('ANALYSIS_JOB_WORKERS', '4'))
+ANALYSIS_JOB_POLL_SECONDS = float(os.getenv('ANALYSIS_JOB_POLL_SECONDS', '1.0'))
+# Running jobs older than this are assumed orphaned and re-queued
+ANALYSIS_JOB_STALE_SECONDS = int(os.getenv('ANALYSIS_JOB_STALE_SECONDS', '900'))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv('ANALYSIS_JOB_MAX_ATTEMPTS', '3'))
+
+# Batch analyze (POST /api/queries/analyze_batch/)
+ANALYZE_BATCH_MAX_QUERIES = int(os.getenv('ANALYZE_BATCH_MAX_QUERIES', '50'))
+ANALYZE_BATCH_PARALLELISM = int(os.getenv('ANALYZE_BATCH_PARALLELISM', '4'))
+ANALYZE_BATCH_MAX_PARALLELISM = int(os.getenv('ANALYZE_BATCH_MAX_PARALLELISM', '8'))
+
+# Largest k accepted by GET /api/properties/top/
+TOP_K_MAX = int(os.getenv('TOP_K_MAX', '100'))
+
+# Memory-mapped dataset shared by all workers (see `manage.py export_dataset`)
+USE_SHARED_DATASET = os.getenv('USE_SHARED_DATASET', 'False') == 'True'
+SHARED_DATASET_PATH = os.getenv('SHARED_DATASET_PATH', os.path.join(BASE_DIR, 'data', 'properties.dataset'))
+
+# Dataset used when a request or load_data.py run doesn't name one
+DEFAULT_DATASET = os.getenv('DEFAULT_DATASET', 'default')
+
+# Seconds the distinct-location list (and dataset name lookups) stay cached per process
+LOCATION_INDEX_TTL = int(os.getenv('LOCATION_INDEX_TTL', '300'))
+
+# Admission control around Gemini calls in analyze (per worker process).
+# Keep GUNICORN_THREADS above LLM_MAX_CONCURRENCY + LLM_MAX_QUEUE so light endpoints always get a thread.
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '4'))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', '10'))
+# Retry-After hint used until a real LLM service time has been observed
+LLM_RETRY_AFTER_SECONDS = int(os.getenv('LLM_RETRY_AFTER_SECONDS', '5'))
+
+# Answer simple listing/statistics questions locally instead of calling Gemini
+LOCAL_FAST_PATH = os.getenv('LOCAL_FAST_PATH', 'True') == 'True'
+# Seconds analyze waits for Gemini before answering locally (0 waits indefinitely)
+LLM_DEADLINE_SECONDS = float(os.getenv('LLM_DEADLINE_SECONDS', '25'))
+# Properties listed per type by the local summarizer
+LOCAL_LISTING_LIMIT = int(os.getenv('LOCAL_LISTING_LIMIT', '50'))
+
+# GET /api/properties/timeseries/ limits
+TIMESERIES_MAX_POINTS = int(os.getenv('TIMESERIES_MAX_POINTS', '500'))
+TIMESERIES_MAX_LOCATIONS = int(os.getenv('TIMESERIES_MAX_LOCATIONS', '10'))
+
+# GET /api/queries/search/ result limit
+QUERY_SEARCH_MAX_RESULTS = int(os.getenv('QUERY_SEARCH_MAX_RESULTS', '50'))
+# Newest matches ranked per search; bounds the cost of very common words
+QUERY_SEARCH_CANDIDATES = int(os.getenv('QUERY_SEARCH_CANDIDATES', '10000'))
+
+# 'gemini', or 'stub' to replace Gemini with a simulated model (see api/llm_stub.py and `manage.py loadtest`)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+# Stub latency: log-normal with this median; sigma 0 makes every call take exactly the median
+LLM_STUB_LATENCY_MS = float(os.getenv('LLM_STUB_LATENCY_MS', '1500'))
+LLM_STUB_LATENCY_SIGMA = float(os.getenv('LLM_STUB_LATENCY_SIGMA', '0.5'))
+# Fraction of stub calls that raise instead of answering
+LLM_STUB_ERROR_RATE = float(os.getenv('LLM_STUB_ERROR_RATE', '0'))
+LLM_STUB_SEED = os.getenv('LLM_STUB_SEED')
+
+# Staff-only request profiling with `X-Profile: 1` or `?profile=1` (see api/profiling.py)
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', 'True') == 'True'
+PROFILE_MAX_SQL_QUERIES = int(os.getenv('PROFILE_MAX_SQL_QUERIES', '1000'))
+# Functions listed in the saved text summary (the .prof download has everything)
+PROFILE_SUMMARY_LINES = int(os.getenv('PROFILE_SUMMARY_LINES', '60'))
+
+# Per-process LRU cache of the data context and rendered prompt data per (location, data version)
+DATA_CONTEXT_CACHE_MAX_MB = float(os.getenv('DATA_CONTEXT_CACHE_MAX_MB', '64'))
+
+# SQLite connection pragmas (applied in api.apps.configure_sqlite; WAL is always on)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '20000'))
+
+# Dataset reloads stage the new rows in batches that commit separately, so the write lock
+# is only held for one batch at a time. On SQLite the loader then pauses, long enough for
+# writers waiting in busy_timeout (which retries at least every 100 ms) to get the lock.
+RELOAD_BATCH_ROWS = int(os.getenv('RELOAD_BATCH_ROWS', '10000'))
+RELOAD_BATCH_PAUSE_MS = int(os.getenv('RELOAD_BATCH_PAUSE_MS', '120'))
+
+# Conversation sessions for POST /api/queries/analyze/ with `sessionId`
+# Idle sessions expire after this many seconds (sliding)
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', '1800'))
+# Turns kept (and sent back to the model) per session; older ones are dropped
+SESSION_MAX_TURNS = int(os.getenv('SESSION_MAX_TURNS', '8'))
+# Earlier answers are stored truncated to this many characters
+SESSION_ANSWER_CHARS = int(os.getenv('SESSION_ANSWER_CHARS', '1200'))
+
+# Database time allowed per request by `manage.py check_query_budgets` (query-count budgets live in the command)
+QUERY_BUDGET_MAX_SQL_MS = float(os.getenv('QUERY_BUDGET_MAX_SQL_MS', '500'))
+
+# Approximate statistics for analyze: result sets of at least this many rows are summarized in one
+# streaming pass (KLL medians, a random sample in the prompt and table) instead of loaded. 0 disables.
+# Not used with USE_SHARED_DATASET, whose rows are already memory-mapped.
+APPROX_STATS_MIN_ROWS = int(os.getenv('APPROX_STATS_MIN_ROWS', '0'))
+APPROX_STATS_CHUNK_SIZE = int(os.getenv('APPROX_STATS_CHUNK_SIZE', '5000'))
+APPROX_STATS_SAMPLE_ROWS = int(os.getenv('APPROX_STATS_SAMPLE_ROWS', '200'))
+# Larger k, smaller quantile error (about 1.65% of the rank at k=200, see api/sketches.py)
+APPROX_STATS_KLL_K = int(os.getenv('APPROX_STATS_KLL_K', '200'))
+# Fixed seed, so the same data always gives the same sample and estimates
+APPROX_STATS_SEED = int(os.getenv('APPROX_STATS_SEED', '0'))
@@ -0,0 +1,20 @@
+# Picked up automatically by `gunicorn config.wsgi` when started from backend/
+import os
+
+# Threaded workers: analyze requests blocked on Gemini are capped by the LLM
+# admission limiter, leaving the remaining threads free for light endpoints
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '12'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+
+def post_worker_init(worker):
+    # Runs in each worker after the Django app is loaded, before it accepts requests
+    from api.warmup import warm_up
+
+    # Failed steps are logged by warm_up and skipped; the worker boots regardless
+    timings = warm_up()
+    worker.log.info("Warm-up done in %.1f ms (%s)", sum(s for _, s, _ in timings) * 1000,
+                    ', '.join(f"{name} {seconds * 1000:.0f} ms" + (" FAILED" if error else "")
+                              for name, seconds, error in timings))
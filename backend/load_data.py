@@ -1,4 +1,6 @@
 import os
+import re
+import argparse
 import django
 import pandas as pd
 from pathlib import Path
@@ -6,11 +8,15 @@ from pathlib import Path
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
+from django.conf import settings
+from django.core.management import call_command
 from api.models import Property
+from api.dataset_file import dataset_path, export_dataset
+from api.services import DataProcessingService
 
 
-def load_excel_data(excel_path):
-    """Load data from Excel file and populate the database"""
+def load_excel_data(excel_path, prewarm=False, dataset=None):
+    """Load data from Excel file into `dataset`, replacing its previous rows"""
     try:
         # Read Excel file
         df = pd.read_excel(excel_path)
@@ -19,11 +25,7 @@ def load_excel_data(excel_path):
         print(f"Found {len(df)} rows")
         print(f"Columns: {list(df.columns)}")
         
-        # Clear existing data
-        Property.objects.all().delete()
-        print("Cleared existing properties")
-        
-        # Prepare batch insert
+        # Parse every row before touching the table
         properties = []
         
         for idx, row in df.iterrows():
@@ -76,26 +78,45 @@ def load_excel_data(excel_path):
                 print(f"Error processing row {idx}: {e}")
                 continue
         
-        # Bulk create
-        Property.objects.bulk_create(properties, batch_size=100)
-        print(f"Successfully loaded {len(properties)} properties into database")
+        # Staged in batches, then swapped in atomically; readers see the old data until the swap.
+        # Other datasets are left as they are.
+        dataset = DataProcessingService.replace_properties(
+            properties, dataset=dataset, source=os.path.basename(excel_path)
+        )
+        print(f"Successfully loaded {len(properties)} properties into dataset {dataset.name}")
         
         # Print summary
-        locations = Property.objects.values_list('location', flat=True).distinct()
-        print(f"Locations: {list(locations)}")
-        print(f"Total properties: {Property.objects.count()}")
+        print(f"Locations: {DataProcessingService.location_index(dataset=dataset.name)}")
+        print(f"Total properties: {dataset.row_count}")
+        
+        # Atomically swap in the memory-mapped copy the workers read from
+        if settings.USE_SHARED_DATASET:
+            export_dataset(dataset=dataset.name)
+            print(f"Exported shared dataset to {dataset_path(dataset.name)}")
+        
+        if prewarm:
+            call_command('prewarm_summaries', dataset=dataset.name)
         
     except Exception as e:
         print(f"Error loading data: {e}")
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load Sample_data.xlsx (or --file) into a dataset')
+    parser.add_argument('--prewarm', action='store_true', help='Pre-generate summaries after loading')
+    parser.add_argument('--dataset', default=settings.DEFAULT_DATASET,
+                        help='Dataset to create or replace (letters, digits, - and _)')
+    parser.add_argument('--file', help='Excel file to load (default: Sample_data.xlsx in the project root)')
+    args = parser.parse_args()
+    
     # Find Sample_data.xlsx in parent directory
     project_root = Path(__file__).resolve().parent.parent
-    excel_file = project_root / 'Sample_data.xlsx'
+    excel_file = Path(args.file) if args.file else project_root / 'Sample_data.xlsx'
     
-    if excel_file.exists():
-        load_excel_data(str(excel_file))
+    if not re.fullmatch(r'[-a-zA-Z0-9_]+', args.dataset):
+        print(f"Invalid dataset name {args.dataset!r}: use letters, digits, - and _")
+    elif excel_file.exists():
+        load_excel_data(str(excel_file), prewarm=args.prewarm, dataset=args.dataset)
     else:
         print(f"Excel file not found at {excel_file}")
         print(f"Please place Sample_data.xlsx in the project root directory")
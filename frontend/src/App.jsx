@@ -12,6 +12,8 @@ export default function App() {
   const [currentData, setCurrentData] = useState(null)
   const messagesEndRef = useRef(null)
   const [stats, setStats] = useState(null)
+  // Server-side conversation, so follow-ups don't resend the whole dataset
+  const [sessionId, setSessionId] = useState(null)
 
   // Auto-scroll to latest message
   useEffect(() => {
@@ -32,8 +34,9 @@ export default function App() {
     setLoading(true)
 
     try {
-      const response = await queryAnalysis(inputValue)
+      const response = await queryAnalysis(inputValue, sessionId)
       const { summary, chartData, tableData, queryType } = response.data
+      setSessionId(response.data.sessionId)
 
       const botMessage = {
         role: 'bot',
@@ -9,24 +9,40 @@ const api = axios.create({
   },
 })
 
-export const queryAnalysis = (query) => {
-  return api.post('/queries/analyze/', { query })
+// sessionId: null starts a conversation session, the returned sessionId continues it.
+// dataset: name of a loaded dataset; the server's default dataset when omitted
+export const queryAnalysis = (query, sessionId = null, dataset = null) => {
+  return api.post('/queries/analyze/', { query, sessionId, ...(dataset && { dataset }) })
 }
 
 export const getAllProperties = () => {
   return api.get('/properties/')
 }
 
-export const downloadData = (query) => {
-  return api.post('/queries/download_data/', { query }, { responseType: 'blob' })
+export const downloadData = (query, dataset = null) => {
+  return api.post('/queries/download_data/', { query, ...(dataset && { dataset }) }, { responseType: 'blob' })
 }
 
-export const getLocations = () => {
-  return api.get('/properties/locations_list/')
+export const getLocations = (dataset = null) => {
+  return api.get('/properties/locations_list/', { params: dataset ? { dataset } : {} })
+}
+
+export const getDatasets = () => {
+  return api.get('/properties/datasets/')
+}
+
+export const getTimeSeries = (locations, metric = 'price', options = {}) => {
+  return api.get('/properties/timeseries/', {
+    params: { locations: locations.join(','), metric, ...options },
+  })
 }
 
 export const getQueryHistory = () => {
   return api.get('/queries/history/')
 }
 
+export const searchQueries = (q, limit = 10) => {
+  return api.get('/queries/search/', { params: { q, limit } })
+}
+
 export default api